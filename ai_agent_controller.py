@@ -20,15 +20,21 @@ ZERO WASTE POLICY:
 
 import logging
 import os
+import re
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from functools import lru_cache
 import time
+import pytz
 from google.cloud import firestore
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# pick_best_story response fields
+_CHOICE_RE = re.compile(r'CHOICE:\s*(\d)')
+_REASON_RE = re.compile(r'REASON:\s*(.+)')
+
 
 class TTLCache:
     """Simple time-based cache for reducing Firestore reads."""
@@ -95,7 +101,7 @@ class AIAgentController:
 
         # Initialize vector memory for AI context
         from memory_system import VectorMemory
-        self.vector_memory = VectorMemory(project_id=project_id)
+        self.vector_memory = VectorMemory(project_id=project_id, db=self.db)
         logger.info("Vector memory initialized - AI has context awareness")
 
         # Daily counters (reset at midnight)
@@ -104,7 +110,6 @@ class AIAgentController:
 
     def _get_today_str(self) -> str:
         """Get today's date string in configured timezone."""
-        import pytz
         tz = pytz.timezone(Config.TIMEZONE)
         return datetime.now(tz).strftime("%Y-%m-%d")
 
@@ -220,35 +225,30 @@ class AIAgentController:
         """
         mentions_today = self._daily_stats.get("mentions_checked", 0)
 
-        # Check last mention check time
+        # Check last mention check time - it lives on the daily stats doc, so the
+        # TTL-cached copy (kept current by record_mention_check) saves a GET
         try:
-            doc_ref = self.budget_collection.document(f"daily_{self._today_str}")
-            doc = doc_ref.get()
-
-            if doc.exists:
-                data = doc.to_dict()
-                last_check = data.get("last_mention_check")
-
-                if last_check:
-                    # Convert to datetime with proper timezone handling
-                    import pytz
-                    if isinstance(last_check, datetime):
-                        last_check_time = last_check
-                        # Ensure timezone-aware comparison
-                        if last_check_time.tzinfo is None:
-                            last_check_time = last_check_time.replace(tzinfo=pytz.UTC)
-                        now = datetime.now(pytz.UTC)
-                    else:
-                        # Handle unexpected types gracefully
-                        logger.warning(f"Unexpected last_check type: {type(last_check)}")
-                        return True, "OK to check mentions (timestamp parse issue)"
-
-                    time_since = now - last_check_time
-                    minutes_since = time_since.total_seconds() / 60
-
-                    if minutes_since < 15:
-                        wait_minutes = 15 - int(minutes_since)
-                        return False, f"Rate limit: wait {wait_minutes} more minutes"
+            last_check = self._load_daily_stats().get("last_mention_check")
+
+            if last_check:
+                # Convert to datetime with proper timezone handling
+                if isinstance(last_check, datetime):
+                    last_check_time = last_check
+                    # Ensure timezone-aware comparison
+                    if last_check_time.tzinfo is None:
+                        last_check_time = last_check_time.replace(tzinfo=pytz.UTC)
+                    now = datetime.now(pytz.UTC)
+                else:
+                    # Handle unexpected types gracefully
+                    logger.warning(f"Unexpected last_check type: {type(last_check)}")
+                    return True, "OK to check mentions (timestamp parse issue)"
+
+                time_since = now - last_check_time
+                minutes_since = time_since.total_seconds() / 60
+
+                if minutes_since < 15:
+                    wait_minutes = 15 - int(minutes_since)
+                    return False, f"Rate limit: wait {wait_minutes} more minutes"
 
         except Exception as e:
             logger.warning(f"Could not check last mention time: {e}")
@@ -277,19 +277,80 @@ class AIAgentController:
 
         return True, f"OK to reply ({replies_today}/{target_replies} replies, {total_tweets_today}/17 total)"
 
-    def record_post_created(self, post_type: str):
-        """Record that a post was created."""
-        self._update_daily_stat("posts_created", 1)
-
+    @staticmethod
+    def _post_stat_increments(post_type: str) -> Dict[str, int]:
+        """Daily counters bumped by a post of this type."""
+        increments = {"posts_created": 1}
         if post_type == "video":
-            self._update_daily_stat("videos_generated", 1)
+            increments["videos_generated"] = 1
         elif post_type in ["image", "infographic"]:
-            self._update_daily_stat("images_generated", 1)
-
+            increments["images_generated"] = 1
+        return increments
+
+    def _post_stats_update(self, increments: Dict[str, int]) -> Dict:
+        """Firestore update payload for a set of counter increments."""
+        update = {stat: firestore.Increment(n) for stat, n in increments.items()}
+        update["last_updated"] = firestore.SERVER_TIMESTAMP
+        return update
+
+    def _apply_local_increments(self, increments: Dict[str, int]):
+        """Mirror committed increments in local stats and drop the TTL cache."""
+        for stat, n in increments.items():
+            self._daily_stats[stat] = self._daily_stats.get(stat, 0) + n
+        self._stats_cache.invalidate(f"daily_stats_{self._today_str}")
+
+    def _log_post_stats(self):
         logger.info(f"📊 Daily stats: {self._daily_stats.get('posts_created', 0)} posts, "
                    f"{self._daily_stats.get('videos_generated', 0)} videos, "
                    f"{self._daily_stats.get('images_generated', 0)} images")
 
+    def record_post_created(self, post_type: str):
+        """Record that a post was created."""
+        increments = self._post_stat_increments(post_type)
+        try:
+            doc_ref = self.budget_collection.document(f"daily_{self._today_str}")
+            doc_ref.set(self._post_stats_update(increments), merge=True)
+            self._apply_local_increments(increments)
+        except Exception as e:
+            logger.error(f"Failed to update post stats: {e}")
+
+        self._log_post_stats()
+
+    def record_post_and_log(self, strategy: Dict, success: bool, post_type: str,
+                            error: Optional[str] = None):
+        """
+        Log a post attempt and (on success) bump daily counters in one batched write.
+
+        Replaces a brain.log_post() + record_post_created() pair - one Firestore
+        round-trip instead of two, and the log and counters can't disagree.
+        """
+        data = strategy.copy()
+        data["success"] = success
+        if error:
+            data["error"] = error
+        if "timestamp" not in data:
+            data["timestamp"] = firestore.SERVER_TIMESTAMP
+
+        increments = self._post_stat_increments(post_type) if success else {}
+        try:
+            batch = self.db.batch()
+            batch.set(self.posts_collection.document(), data)
+            if increments:
+                # merge=True so a missing daily doc is created rather than
+                # failing the whole batch (and losing the post log with it)
+                batch.set(
+                    self.budget_collection.document(f"daily_{self._today_str}"),
+                    self._post_stats_update(increments),
+                    merge=True
+                )
+            batch.commit()
+            self._apply_local_increments(increments)
+        except Exception as e:
+            logger.error(f"Failed to record post: {e}")
+
+        if success:
+            self._log_post_stats()
+
     def record_reply_created(self):
         """Record that a reply was sent."""
         self._update_daily_stat("replies_created", 1)
@@ -304,6 +365,9 @@ class AIAgentController:
                 "last_mention_check": firestore.SERVER_TIMESTAMP
             })
             self._daily_stats["mentions_checked"] = self._daily_stats.get("mentions_checked", 0) + 1
+            # Write through so can_check_mentions sees it without re-reading the doc
+            self._daily_stats["last_mention_check"] = datetime.now(timezone.utc)
+            self._stats_cache.set(f"daily_stats_{self._today_str}", self._daily_stats)
         except Exception as e:
             logger.error(f"Failed to record mention check: {e}")
 
@@ -339,7 +403,6 @@ class AIAgentController:
         can_check, check_reason = self.can_check_mentions()
 
         # Check time of day for smart scheduling
-        import pytz
         tz = pytz.timezone(Config.TIMEZONE)
         current_hour = datetime.now(tz).hour
 
@@ -426,14 +489,13 @@ REASON: <one sentence why>"""
             response = ai_generate_func(prompt)
 
             # Parse choice
-            import re
-            match = re.search(r'CHOICE:\s*(\d)', response)
+            match = _CHOICE_RE.search(response)
             if match:
                 choice = int(match.group(1)) - 1  # Convert to 0-indexed
 
                 if 0 <= choice < len(stories):
                     chosen = stories[choice]
-                    reason_match = re.search(r'REASON:\s*(.+)', response)
+                    reason_match = _REASON_RE.search(response)
                     reason = reason_match.group(1) if reason_match else "AI preference"
 
                     logger.info(f"✅ AI chose story {choice + 1}: {chosen.get('title', '')[:50]}")
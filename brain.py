@@ -2,16 +2,20 @@ import logging
 import vertexai
 from typing import List, Optional, Dict
 from google.cloud import aiplatform
-from vertexai.generative_models import GenerativeModel, Tool
+from vertexai.generative_models import GenerationConfig, GenerativeModel, Tool
 from vertexai.preview.generative_models import grounding
 from vertexai.preview.vision_models import ImageGenerationModel
 from google.cloud import firestore
 from config import Config
 from news_fetcher import NewsFetcher
 from tone_validator import ToneValidator
+from twitter_io import TCO_URL_LENGTH, TWEET_LIMIT, truncate_tweet, weighted_len
 import datetime
+import json
 import os
 import re
+import time
+import pytz
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 # Optional imports for new features
@@ -85,6 +89,19 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Structured output for _ai_select_and_evaluate (Gemini response_schema)
+SELECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pick": {"type": "integer"},
+        "post": {"type": "boolean"},
+        "reason": {"type": "string"},
+        "style": {"type": "string"},
+        "format_hint": {"type": "string", "enum": ["VIDEO", "MEME", "INFOGRAPHIC", "TEXT", "THOUGHT"]},
+    },
+    "required": ["pick", "post", "reason", "style", "format_hint"],
+}
+
 
 # ============================================================================
 # AI Response Parser - Robust handling of AI-to-AI data flow
@@ -99,87 +116,6 @@ class AIResponseParser:
     # Valid format types that can be used
     VALID_FORMATS = {'VIDEO', 'MEME', 'INFOGRAPHIC', 'TEXT', 'IMAGE', 'THOUGHT'}
 
-    @staticmethod
-    def parse_field(response: str, field_name: str, default: str = '') -> str:
-        """
-        Safely extract a field value from AI response.
-        Handles various formats: "FIELD: value", "FIELD:value", "FIELD value"
-        """
-        if not response:
-            return default
-
-        # Clean the response
-        response = response.strip()
-
-        # Try regex patterns in order of specificity
-        patterns = [
-            rf'{field_name}:\s*(.+?)(?:\n|$)',  # FIELD: value (with newline/end)
-            rf'{field_name}:\s*([^\n]+)',        # FIELD: value (greedy to newline)
-            rf'{field_name}\s*[:=]\s*(.+?)(?:\n|$)',  # FIELD = value or FIELD: value
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                value = match.group(1).strip()
-                # Clean markdown and quotes
-                value = value.replace('**', '').replace('*', '').strip('"').strip("'")
-                if value and value.upper() != 'N/A':
-                    return value
-
-        return default
-
-    @staticmethod
-    def parse_number(response: str, field_name: str, default: int = 0, max_value: int = None) -> int:
-        """Safely extract a numeric field, with bounds checking."""
-        value_str = AIResponseParser.parse_field(response, field_name, str(default))
-
-        # Extract just the number
-        match = re.search(r'(\d+)', value_str)
-        if match:
-            value = int(match.group(1))
-            if max_value is not None:
-                value = min(value, max_value)
-            return max(0, value)
-
-        return default
-
-    @staticmethod
-    def parse_boolean(response: str, field_name: str, default: bool = True) -> bool:
-        """Safely extract a boolean field (YES/NO, TRUE/FALSE)."""
-        value = AIResponseParser.parse_field(response, field_name, '').upper()
-
-        if value in ('YES', 'TRUE', '1', 'Y'):
-            return True
-        elif value in ('NO', 'FALSE', '0', 'N'):
-            return False
-
-        # Fallback: check if field with YES/NO appears anywhere
-        pattern = rf'{field_name}[:\s]*(YES|NO)'
-        match = re.search(pattern, response.upper())
-        if match:
-            return match.group(1) == 'YES'
-
-        return default
-
-    @staticmethod
-    def parse_format_hint(response: str, default: str = 'TEXT') -> str:
-        """
-        Parse format hint ensuring it's a valid type.
-        Returns validated format or default.
-        """
-        hint = AIResponseParser.parse_field(response, 'FORMAT_HINT', default).upper()
-
-        # Clean up common variations
-        hint = hint.replace('FORMAT:', '').replace('HINT:', '').strip()
-
-        # Extract just the format word
-        for fmt in AIResponseParser.VALID_FORMATS:
-            if fmt in hint:
-                return fmt
-
-        return default
-
     @staticmethod
     def clean_prompt(prompt: str, min_length: int = 30) -> Optional[str]:
         """
@@ -235,9 +171,9 @@ class AIResponseParser:
         if len(caption) < min_len:
             return None
 
-        # Truncate if too long
-        if len(caption) > max_len:
-            caption = caption[:max_len-3] + "..."
+        # Truncate if too long (Twitter-weighted, so emoji/CJK count double)
+        if weighted_len(caption) > max_len:
+            caption = truncate_tweet(caption, max_len)
 
         return caption
 
@@ -277,6 +213,11 @@ You're not a cheerleader. You're not a doomer. You're a veteran who's seen it al
 BIG_BOSS_PERSONA = PERSONA_CONTEXT
 
 class AgentBrain:
+    # Working Gemini models from the last discovery, shared across job runs
+    MODEL_CACHE_COLLECTION = "system_state"
+    MODEL_CACHE_DOC = "gemini_models"
+    MODEL_CACHE_TTL = datetime.timedelta(hours=6)
+
     def __init__(self):
         self.project_id = Config.PROJECT_ID
         self.location = Config.REGION
@@ -284,6 +225,9 @@ class AgentBrain:
         vertexai.init(project=self.project_id, location=self.location)
         aiplatform.init(project=self.project_id, location=self.location)
 
+        # Needed before discovery, which reads/writes the model cache
+        self.db = firestore.Client(project=self.project_id)
+
         self.model_names = []
         self.models = {}
         self._current_ai_eval = {}  # Stores AI evaluation for content styling
@@ -317,7 +261,6 @@ class AgentBrain:
             logger.warning("WARNING Google Search grounding disabled (Gemini 1.5 models not available)")
             logger.warning("   Using instructed search mode - model will be told to only use real URLs")
 
-        self.db = firestore.Client(project=self.project_id)
         self.collection = self.db.collection(Config.COLLECTION_NAME)
 
         # Initialize news fetcher for real URLs
@@ -461,15 +404,62 @@ Make your own decisions. Stay in character.
         if TOON_AVAILABLE:
             return toon(data)
         else:
-            import json
             return json.dumps(data, indent=2)
 
+    def _model_cache_ref(self):
+        return self.db.collection(self.MODEL_CACHE_COLLECTION).document(self.MODEL_CACHE_DOC)
+
+    def _load_cached_models(self) -> list:
+        """Model names from a discovery within MODEL_CACHE_TTL, else []."""
+        try:
+            doc = self._model_cache_ref().get()
+            if not doc.exists:
+                return []
+            data = doc.to_dict()
+            discovered_at = data.get("discovered_at")
+            if not discovered_at:
+                return []
+            age = datetime.datetime.now(datetime.timezone.utc) - discovered_at
+            if age > self.MODEL_CACHE_TTL:
+                return []
+            return list(data.get("models") or [])
+        except Exception as e:
+            logger.warning(f"Could not read model cache: {e}")
+            return []
+
+    def _save_cached_models(self, model_names: list):
+        try:
+            self._model_cache_ref().set({
+                "models": model_names,
+                "discovered_at": firestore.SERVER_TIMESTAMP
+            })
+        except Exception as e:
+            logger.warning(f"Could not save model cache: {e}")
+
+    def _clear_cached_models(self):
+        """Force a fresh probe next run (cached models stopped working)."""
+        try:
+            self._model_cache_ref().delete()
+        except Exception as e:
+            logger.warning(f"Could not clear model cache: {e}")
+
     def _discover_available_models(self) -> list:
         """
         Dynamically discovers available Gemini models from Vertex AI.
         Uses SDK instantiation to test which models work.
         Returns list of working model names.
+
+        A recent discovery cached in Firestore is reused without probing -
+        each probe is a generate_content round trip, most of them 404s.
         """
+        cached_models = self._load_cached_models()
+        if cached_models:
+            for model_name in cached_models:
+                self.models[model_name] = GenerativeModel(model_name)
+                self.model_names.append(model_name)
+            logger.info(f"✓ Using cached model discovery ({len(cached_models)}): {self.model_names}")
+            return cached_models
+
         discovered_models = []
 
         logger.info("Discovering available Gemini models from Vertex AI...")
@@ -494,7 +484,6 @@ Make your own decisions. Stay in character.
                         candidates.append(f"gemini-{version}-{variant}-{release}")
 
             # Add experimental date-based models
-            import datetime
             today = datetime.datetime.now()
             for days_back in [0, 7, 14, 30]:  # Recent experiments only
                 date = today - datetime.timedelta(days=days_back)
@@ -548,6 +537,9 @@ Make your own decisions. Stay in character.
         self.model_names.sort(key=model_priority)
         logger.info(f"✓ Active models ({len(discovered_models)}): {self.model_names}")
 
+        if self.model_names:
+            self._save_cached_models(self.model_names)
+
         return discovered_models
 
     def _get_daily_media_usage(self) -> dict:
@@ -557,8 +549,6 @@ Make your own decisions. Stay in character.
 
         Uses configured timezone (AWST by default) for day boundary calculation.
         """
-        import datetime
-        import pytz
 
         try:
             # Get configured timezone (AWST - Australia/Perth by default)
@@ -684,8 +674,6 @@ Make your own decisions. Stay in character.
 
         COST: No API calls, just time check and random.
         """
-        import datetime
-        import pytz
         import random
 
         # Already have a video today - AI decides freely
@@ -758,8 +746,6 @@ Make your own decisions. Stay in character.
         Single Firestore query for efficiency - no excessive API calls.
         Returns a formatted string the AI can use for self-awareness.
         """
-        import datetime
-        import pytz
 
         try:
             tz = pytz.timezone(Config.TIMEZONE)
@@ -1010,8 +996,7 @@ Write ONE caption that matches this specific video:"""
             caption = caption.strip().strip('"').strip("'")
 
             # Validate and truncate
-            if len(caption) > 280:
-                caption = caption[:277] + "..."
+            caption = truncate_tweet(caption)
 
             if len(caption) < 20:
                 # Fallback based on category
@@ -1169,16 +1154,16 @@ Write ONE caption that matches this specific video:"""
 
         return True
 
-    def _generate_with_fallback(self, prompt: str, tools: list = None, require_url: bool = False) -> str:
+    def _generate_with_fallback(self, prompt: str, tools: list = None, require_url: bool = False,
+                                schema: dict = None) -> str:
         """
         Attempts to generate content using available models with fallback.
         Tries each model in order until successful or all fail.
         Includes retry logic for transient errors (429, 503, etc.)
 
         If require_url=True and tools are provided, validates that response contains real URLs.
+        If schema is given, the model returns JSON matching it (structured output).
         """
-        import time
-
         # Rate limiting: ensure minimum interval between AI calls
         elapsed = time.time() - self._last_ai_call_time
         if elapsed < self._ai_call_min_interval:
@@ -1187,19 +1172,30 @@ Write ONE caption that matches this specific video:"""
             time.sleep(wait_time)
         self._last_ai_call_time = time.time()
 
+        generation_config = None
+        if schema:
+            generation_config = GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=schema
+            )
+
         last_error = None
         max_retries_per_model = 2
         transient_error_codes = ['429', '503', '500', 'quota', 'rate', 'overloaded']
+        missing_error_codes = ['404', 'not found']
+        # Stays True only if every model tried failed as missing (404/NotFound)
+        all_models_missing = bool(self.models)
 
         for model_name in self.model_names:
             if model_name not in self.models:
                 continue
 
+            model_missing = False
             for retry in range(max_retries_per_model):
                 try:
                     model = self.models[model_name]
                     # Pass tools if provided (e.g. Grounding)
-                    response = model.generate_content(prompt, tools=tools)
+                    response = model.generate_content(prompt, tools=tools, generation_config=generation_config)
 
                     if response.text:
                         text = response.text.strip()
@@ -1228,6 +1224,8 @@ Write ONE caption that matches this specific video:"""
 
                     # Check if it's a transient error worth retrying
                     is_transient = any(code in error_str for code in transient_error_codes)
+                    model_missing = (type(e).__name__ == 'NotFound'
+                                     or any(code in error_str for code in missing_error_codes))
 
                     if is_transient and retry < max_retries_per_model - 1:
                         wait_time = (retry + 1) * 5  # Exponential backoff: 5s, 10s
@@ -1238,7 +1236,12 @@ Write ONE caption that matches this specific video:"""
                         logger.warning(f"✗ {model_name} failed: {str(e)[:100]}")
                         break  # Try next model
 
-        # All models failed
+            all_models_missing = all_models_missing and model_missing
+
+        # Every model is gone - the cached discovery is stale. Rate limits,
+        # outages or missing URLs say nothing about the model list, so keep it.
+        if all_models_missing:
+            self._clear_cached_models()
         raise RuntimeError(f"All models failed. Last error: {last_error}")
 
     def _extract_article_context(self, title: str, url: str, html_content: str, category: str = "tech") -> str:
@@ -1400,30 +1403,25 @@ FORMAT (pick what fits the story):
 
 SKIP boring press releases, generic announcements, or stories nobody cares about.
 
-RESPOND:
-PICK: <number 1-{len(stories)}> (0 for THOUGHT)
-POST: YES or NO (NO if all stories are boring)
-REASON: <why this will get engagement>
-STYLE: <your angle on this>
-FORMAT_HINT: VIDEO/MEME/INFOGRAPHIC/TEXT/THOUGHT"""
+RESPOND with JSON matching the schema. "pick" is the story number (1-{len(stories)}) -
+for a THOUGHT, pick the story that sparked it. "post" is false if all stories are boring,
+"reason" says why it will get engagement, "style" is your angle, "format_hint" is the FORMAT."""
 
         try:
-            response = self._generate_with_fallback(prompt).strip()
-
-            # Use robust parser for AI response
-            parser = AIResponseParser
+            response = self._generate_with_fallback(prompt, schema=SELECTION_SCHEMA).strip()
+            choice = json.loads(response)
 
-            # Parse selection with bounds checking
-            idx = parser.parse_number(response, 'PICK', default=1, max_value=len(stories)) - 1
+            # Bounds-check the selection; the schema only guarantees an integer
+            idx = int(choice.get('pick', 1)) - 1
             idx = max(0, min(idx, len(stories) - 1))
             selected = stories[idx]
 
-            # Parse evaluation fields using robust parser
+            format_hint = str(choice.get('format_hint', 'TEXT')).upper()
             evaluation = {
-                'should_post': parser.parse_boolean(response, 'POST', default=True),
-                'reason': parser.parse_field(response, 'REASON', 'Selected by AI'),
-                'style_tip': parser.parse_field(response, 'STYLE', ''),
-                'format_hint': parser.parse_format_hint(response, default='TEXT')
+                'should_post': bool(choice.get('post', True)),
+                'reason': choice.get('reason') or 'Selected by AI',
+                'style_tip': choice.get('style', ''),
+                'format_hint': format_hint if format_hint in AIResponseParser.VALID_FORMATS else 'TEXT'
             }
 
             logger.info(f"🎖️ AI selected #{idx+1}: {selected['title'][:50]}...")
@@ -2442,8 +2440,7 @@ GENERATE YOUR THOUGHT:"""
                 if len(thought) < 30:
                     logger.warning(f"Thought too short ({len(thought)} chars), regenerating")
                     raise ValueError("Thought too short")
-                if len(thought) > 280:
-                    thought = thought[:277] + "..."
+                thought = truncate_tweet(thought)
 
                 strategy["content"] = thought
                 strategy["topic"] = "AI Thought"  # Override topic
@@ -2535,26 +2532,25 @@ TWEET:
                 # If we have a URL, ensure it's in the tweet
                 if story_url and story_url not in tweet:
                     logger.warning("Generated tweet missing URL, adding it")
-                    # Try to fit URL in
-                    max_text_len = 280 - len(story_url) - 2  # -2 for spacing
-                    if len(tweet) > max_text_len:
-                        tweet = tweet[:max_text_len-3] + "..."
-                    tweet = f"{tweet}\n\n{story_url}"
+                    # Try to fit URL in - it counts as a t.co link whatever its length
+                    max_text_len = TWEET_LIMIT - TCO_URL_LENGTH - 2  # -2 for spacing
+                    tweet = f"{truncate_tweet(tweet, max_text_len)}\n\n{story_url}"
 
             except Exception as e:
                 logger.error(f"Failed to generate post: {e}")
                 raise
 
             # Strict length check
-            if len(tweet) > 280:
-                logger.warning(f"Tweet too long ({len(tweet)}), truncating.")
+            tweet_len = weighted_len(tweet)
+            if tweet_len > TWEET_LIMIT:
+                logger.warning(f"Tweet too long ({tweet_len}), truncating.")
                 # Try to truncate before URL
                 if story_url and story_url in tweet:
                     parts = tweet.split(story_url)
-                    text_part = parts[0].strip()[:180]  # Leave room for URL
-                    tweet = f"{text_part}...\n\n{story_url}"
+                    text_part = truncate_tweet(parts[0].strip(), TWEET_LIMIT - TCO_URL_LENGTH - 2)
+                    tweet = f"{text_part}\n\n{story_url}"
                 else:
-                    tweet = tweet[:277] + "..."
+                    tweet = truncate_tweet(tweet)
 
             # Final validation
             if not tweet or len(tweet) < 10:
@@ -14,6 +14,7 @@ Production-ready with extensive vocabulary for cinematic excellence.
 
 import logging
 import random
+import re
 from typing import Optional, Dict, List
 
 logger = logging.getLogger(__name__)
@@ -628,7 +629,6 @@ Output ONLY the final video prompt, nothing else:"""
 
     def _parse_field(self, response: str, field: str, default: str) -> str:
         """Parse a field from AI response."""
-        import re
         pattern = rf'{field}:\s*(.+?)(?:\n|$)'
         match = re.search(pattern, response, re.IGNORECASE)
         if match:
@@ -19,8 +19,13 @@ import logging
 import requests
 import tempfile
 import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +60,10 @@ class CivitAIVideoDownloader:
         'fantasy', 'space', 'art', 'cyberpunk'
     ]
 
+    CACHE_MAX_ENTRIES = 128
+
+    VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov')
+
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'application/json',
@@ -69,8 +78,8 @@ class CivitAIVideoDownloader:
                      Works without key but with lower limits.
         """
         self.api_key = api_key or os.getenv("CIVITAI_API_KEY")
-        self._cache: Dict[str, List[Dict]] = {}
-        self._cache_time: Dict[str, datetime] = {}
+        # LRU cache: key -> (cached_at, videos, validators), oldest first
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
         self._cache_duration = timedelta(minutes=30)
 
         if self.api_key:
@@ -81,16 +90,33 @@ class CivitAIVideoDownloader:
 
     def _get_cached(self, key: str) -> Optional[List[Dict]]:
         """Get cached results if still valid."""
-        if key in self._cache:
-            cache_age = datetime.now() - self._cache_time.get(key, datetime.min)
-            if cache_age < self._cache_duration:
-                return self._cache[key]
+        entry = self._cache.get(key)
+        if entry:
+            self._cache.move_to_end(key)
+            cached_at, data, _ = entry
+            if datetime.now() - cached_at < self._cache_duration:
+                return data
         return None
 
-    def _set_cache(self, key: str, data: List[Dict]):
-        """Cache results."""
-        self._cache[key] = data
-        self._cache_time[key] = datetime.now()
+    def _set_cache(self, key: str, data: List[Dict], validators: Optional[Dict[str, str]] = None):
+        """Cache results (plus any HTTP validators for conditional revalidation)."""
+        self._cache[key] = (datetime.now(), data, validators or {})
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    def _conditional_headers(self, key: str) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers for a stale cache entry."""
+        entry = self._cache.get(key)
+        if not entry:
+            return {}
+        validators = entry[2]
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
 
     def fetch_videos(
         self,
@@ -140,9 +166,17 @@ class CivitAIVideoDownloader:
             response = requests.get(
                 url,
                 params=params,
-                headers=self.HEADERS,
+                headers={**self.HEADERS, **self._conditional_headers(cache_key)},
                 timeout=15
             )
+
+            # 304: stale entry is still current - refresh it without a body transfer
+            if response.status_code == 304 and cache_key in self._cache:
+                logger.info(f"CivitAI videos unchanged for {category}, reusing cache")
+                _, videos, validators = self._cache[cache_key]
+                self._set_cache(cache_key, videos, validators)
+                return videos
+
             response.raise_for_status()
             data = response.json()
 
@@ -155,30 +189,36 @@ class CivitAIVideoDownloader:
                 item_url = item.get('url', '')
                 item_type = item.get('type', '')
 
-                # Check if it's a video by type field or URL extension
+                # Check if it's a video by type field or URL extension (ignoring any query string)
                 is_video = (
                     item_type == 'video' or
-                    any(ext in item_url.lower() for ext in ['.mp4', '.webm', '.mov'])
+                    item_url.lower().split('?', 1)[0].endswith(self.VIDEO_EXTENSIONS)
                 )
 
                 if is_video:
+                    stats = item.get('stats') or {}
                     videos.append({
                         'id': item.get('id'),
                         'url': item_url,
                         'width': item.get('width'),
                         'height': item.get('height'),
                         'hash': item.get('hash'),
-                        'stats': item.get('stats', {}),
+                        'stats': stats,
                         'meta': item.get('meta', {}),
                         'username': item.get('username'),
                         'nsfw_level': item.get('nsfwLevel', 'None'),
                         'type': item_type,
+                        # Reaction score, precomputed once for trending sort
+                        '_score': stats.get('likeCount', 0) + stats.get('heartCount', 0) * 2,
                     })
 
             logger.info(f"Found {len(videos)} videos from CivitAI (filtered from {len(items)} items)")
 
             if videos:
-                self._set_cache(cache_key, videos)
+                self._set_cache(cache_key, videos, {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                })
 
             return videos
 
@@ -200,45 +240,42 @@ class CivitAIVideoDownloader:
         if cached:
             return cached
 
-        all_videos = []
+        # Dedup as results arrive so we can stop as soon as we have enough
+        seen_ids = set()
+        unique_videos = []
+
+        def add_unique(videos: List[Dict]):
+            for video in videos:
+                vid = video.get('id')
+                if vid and vid not in seen_ids:
+                    seen_ids.add(vid)
+                    unique_videos.append(video)
 
         # Fetch from multiple categories for diversity
         for category in random.sample(self.TRENDING_CATEGORIES, min(4, len(self.TRENDING_CATEGORIES))):
-            videos = self.fetch_videos(
+            add_unique(self.fetch_videos(
                 category=category,
                 limit=limit // 4,
                 sort='Most Reactions',
                 period='Week'
-            )
-            all_videos.extend(videos)
+            ))
+            if len(unique_videos) >= limit:
+                break
 
             # Small delay to avoid rate limiting
             time.sleep(0.5)
 
-        # Also fetch general trending
-        general_videos = self.fetch_videos(
-            category='general',
-            limit=limit // 2,
-            sort='Most Reactions',
-            period='Week'
-        )
-        all_videos.extend(general_videos)
-
-        # Remove duplicates by ID
-        seen_ids = set()
-        unique_videos = []
-        for video in all_videos:
-            vid = video.get('id')
-            if vid and vid not in seen_ids:
-                seen_ids.add(vid)
-                unique_videos.append(video)
+        # Also fetch general trending (mostly overlaps the categories - skip if we have enough)
+        if len(unique_videos) < limit:
+            add_unique(self.fetch_videos(
+                category='general',
+                limit=limit // 2,
+                sort='Most Reactions',
+                period='Week'
+            ))
 
         # Sort by reactions
-        unique_videos.sort(
-            key=lambda x: x.get('stats', {}).get('likeCount', 0) +
-                         x.get('stats', {}).get('heartCount', 0) * 2,
-            reverse=True
-        )
+        unique_videos.sort(key=itemgetter('_score'), reverse=True)
 
         logger.info(f"Fetched {len(unique_videos)} unique trending videos")
         self._set_cache(cache_key, unique_videos)
@@ -253,19 +290,49 @@ class CivitAIVideoDownloader:
         'video.civitai.com',
     ]
 
-    def download_video(self, video_url: str) -> Optional[str]:
+    # Twitter video limits: 512MB max, but let's be conservative
+    MAX_VIDEO_SIZE = 100 * 1024 * 1024  # 100MB
+    MIN_VIDEO_SIZE = 10000  # Less than 10KB is suspicious
+
+    # Body chunk size when streaming a video into an upload
+    STREAM_CHUNK_SIZE = 1024 * 1024
+
+    # Concurrent candidate downloads in get_video (keep per-host connections modest)
+    DOWNLOAD_WORKERS = 3
+
+    @staticmethod
+    def _content_length(headers) -> Optional[int]:
+        """Parse Content-Length from response headers, None if missing/invalid."""
+        try:
+            return int(headers.get('content-length', ''))
+        except (TypeError, ValueError):
+            return None
+
+    def _check_size(self, size: Optional[int]) -> bool:
+        """Check a known size against video limits (unknown sizes pass)."""
+        if size is None:
+            return True
+        if size > self.MAX_VIDEO_SIZE:
+            logger.warning(f"Video too large ({size} bytes), skipping")
+            return False
+        if size < self.MIN_VIDEO_SIZE:
+            logger.warning(f"Video too small ({size} bytes), might be corrupt")
+            return False
+        return True
+
+    def download_video(self, video_url: str, cancel: Optional[threading.Event] = None) -> Optional[str]:
         """
         Download a video to a temporary file.
 
         Args:
             video_url: Direct URL to the video file
+            cancel: Optional event; once set, the download stops and cleans up
 
         Returns:
             Path to downloaded video file, or None on failure
         """
         try:
             # Validate domain for security (prevent SSRF)
-            from urllib.parse import urlparse
             parsed = urlparse(video_url)
             if not any(domain in parsed.netloc for domain in self.ALLOWED_VIDEO_DOMAINS):
                 logger.warning(f"Untrusted video domain rejected: {parsed.netloc}")
@@ -275,6 +342,17 @@ class CivitAIVideoDownloader:
             safe_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path[:50]}..."
             logger.info(f"Downloading video: {safe_url}")
 
+            # Preflight with HEAD so oversized/broken videos are rejected before any body transfer
+            content_type = ''
+            try:
+                head = requests.head(video_url, headers=self.HEADERS, timeout=10, allow_redirects=True)
+                if head.ok:
+                    if not self._check_size(self._content_length(head.headers)):
+                        return None
+                    content_type = head.headers.get('content-type', '')
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"HEAD preflight failed, falling back to GET: {e}")
+
             response = requests.get(
                 video_url,
                 headers=self.HEADERS,
@@ -283,32 +361,42 @@ class CivitAIVideoDownloader:
             )
             response.raise_for_status()
 
+            # CDN may refuse HEAD - check the GET headers before reading the body
+            if not self._check_size(self._content_length(response.headers)):
+                response.close()
+                return None
+
             # Determine extension from URL or content-type
-            content_type = response.headers.get('content-type', '')
-            if 'webm' in content_type or video_url.lower().endswith('.webm'):
+            content_type = content_type or response.headers.get('content-type', '')
+            url_lower = video_url.lower()
+            if 'webm' in content_type or url_lower.endswith('.webm'):
                 ext = '.webm'
-            elif 'mov' in content_type or video_url.lower().endswith('.mov'):
+            elif 'mov' in content_type or url_lower.endswith('.mov'):
                 ext = '.mov'
             else:
                 ext = '.mp4'
 
-            # Save to temp file
+            # Save to temp file, aborting if the body outgrows the limit or we're cancelled
+            file_size = 0
+            cancelled = False
             with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as f:
+                file_path = f.name
                 for chunk in response.iter_content(chunk_size=8192):
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
                     f.write(chunk)
-                file_path = f.name
-
-            file_size = os.path.getsize(file_path)
+                    file_size += len(chunk)
+                    if file_size > self.MAX_VIDEO_SIZE:
+                        break
 
-            # Twitter video limits: 512MB max, but let's be conservative
-            max_size = 100 * 1024 * 1024  # 100MB
-            if file_size > max_size:
-                logger.warning(f"Video too large ({file_size} bytes), skipping")
+            if cancelled:
+                response.close()
                 os.remove(file_path)
                 return None
 
-            if file_size < 10000:  # Less than 10KB is suspicious
-                logger.warning(f"Video too small ({file_size} bytes), might be corrupt")
+            if not self._check_size(file_size):
+                response.close()
                 os.remove(file_path)
                 return None
 
@@ -322,6 +410,53 @@ class CivitAIVideoDownloader:
             logger.error(f"Error downloading video: {e}")
             return None
 
+    def _pick_candidates(self, category: str, prefer_trending: bool = True) -> List[Dict]:
+        """Shuffled list of up to 5 downloadable videos (trending first, then category)."""
+        videos = []
+
+        if prefer_trending:
+            videos = self.fetch_trending_videos()
+
+        if not videos:
+            videos = self.fetch_videos(category=category)
+
+        if not videos:
+            logger.warning(f"No videos found for category: {category}")
+            return []
+
+        random.shuffle(videos)
+        return [v for v in videos[:5] if v.get('url')]
+
+    @staticmethod
+    def _selected_metadata(video: Dict, category: str) -> Dict:
+        """Log the chosen video and build the metadata used for caption generation."""
+        stats = video.get('stats', {})
+        logger.info(f"Selected video - Likes: {stats.get('likeCount', 0)}, "
+                   f"Hearts: {stats.get('heartCount', 0)}, "
+                   f"Creator: {video.get('username', 'unknown')}")
+
+        return {
+            'id': video.get('id'),
+            'stats': stats,
+            'meta': video.get('meta', {}),
+            'username': video.get('username', 'unknown'),
+            'category': category,
+            'url': video['url'],
+        }
+
+    @staticmethod
+    def _discard_download(future):
+        """Remove the temp file of a download that lost the race."""
+        try:
+            path = future.result()
+        except Exception:
+            return
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
     def get_video(
         self,
         category: str = 'general',
@@ -340,46 +475,31 @@ class CivitAIVideoDownloader:
             Dict with 'path' and 'metadata', or None on failure
             metadata includes: id, stats, meta, username, category
         """
-        videos = []
-
-        if prefer_trending:
-            videos = self.fetch_trending_videos()
-
-        if not videos:
-            videos = self.fetch_videos(category=category)
-
-        if not videos:
-            logger.warning(f"No videos found for category: {category}")
+        candidates = self._pick_candidates(category, prefer_trending)
+        if not candidates:
             return None
 
-        # Try up to 5 videos in case of download failures
-        random.shuffle(videos)
-
-        for video in videos[:5]:
-            video_url = video.get('url')
-            if not video_url:
-                continue
-
-            video_path = self.download_video(video_url)
-            if video_path:
-                # Log some metadata
-                stats = video.get('stats', {})
-                logger.info(f"Selected video - Likes: {stats.get('likeCount', 0)}, "
-                           f"Hearts: {stats.get('heartCount', 0)}, "
-                           f"Creator: {video.get('username', 'unknown')}")
-
-                # Return both path AND metadata for caption generation
-                return {
-                    'path': video_path,
-                    'metadata': {
-                        'id': video.get('id'),
-                        'stats': stats,
-                        'meta': video.get('meta', {}),
-                        'username': video.get('username', 'unknown'),
-                        'category': category,
-                        'url': video_url,
-                    }
-                }
+        # Try up to 5 videos in case of download failures - download concurrently, first success wins
+        executor = ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS)
+        cancel = threading.Event()
+        futures = {executor.submit(self.download_video, v['url'], cancel): v for v in candidates}
+        try:
+            for future in as_completed(futures):
+                video_path = future.result()
+                if not video_path:
+                    continue
+
+                # Losers still streaming stop at their next chunk and remove their
+                # partial file; one that finished first is discarded on completion
+                cancel.set()
+                for other in futures:
+                    if other is not future and not other.cancel():
+                        other.add_done_callback(self._discard_download)
+
+                video = futures[future]
+                return {'path': video_path, 'metadata': self._selected_metadata(video, category)}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
         logger.error("Failed to download any video from CivitAI")
         return None
@@ -397,10 +517,11 @@ class CivitAIVideoDownloader:
         Returns:
             Dict with 'path' and 'metadata', or None on failure
         """
-        prompt_lower = prompt.lower()
+        return self.get_video(category=self._category_for_prompt(prompt))
 
-        # Try to match prompt to a category
-        category = 'general'
+    def _category_for_prompt(self, prompt: str) -> str:
+        """Guess a category from prompt keywords ('general' if nothing matches)."""
+        prompt_lower = prompt.lower()
 
         category_keywords = {
             'anime': ['anime', 'manga', 'japanese', 'cartoon'],
@@ -415,11 +536,70 @@ class CivitAIVideoDownloader:
 
         for cat, keywords in category_keywords.items():
             if any(kw in prompt_lower for kw in keywords):
-                category = cat
-                logger.info(f"Matched prompt to category: {category}")
-                break
+                logger.info(f"Matched prompt to category: {cat}")
+                return cat
+
+        return 'general'
+
+    def open_video_stream(self, video_url: str) -> Optional[Dict]:
+        """
+        Open a video for streaming straight into an upload, without touching disk.
+
+        Only works when the server reports Content-Length (chunked upload INIT
+        needs the total size up front).
 
-        return self.get_video(category=category)
+        Returns:
+            Dict with 'chunks' (iterator of bytes), 'size', 'media_type' and
+            'close' (releases the connection), or None if not streamable
+        """
+        parsed = urlparse(video_url)
+        if not any(domain in parsed.netloc for domain in self.ALLOWED_VIDEO_DOMAINS):
+            logger.warning(f"Untrusted video domain rejected: {parsed.netloc}")
+            return None
+
+        try:
+            response = requests.get(video_url, headers=self.HEADERS, timeout=60, stream=True)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Video stream failed: {e}")
+            return None
+
+        size = self._content_length(response.headers)
+        if size is None or not self._check_size(size):
+            response.close()
+            return None
+
+        content_type = response.headers.get('content-type', '')
+        url_lower = video_url.lower()
+        if 'webm' in content_type or url_lower.endswith('.webm'):
+            media_type = 'video/webm'
+        elif 'mov' in content_type or url_lower.endswith('.mov'):
+            media_type = 'video/quicktime'
+        else:
+            media_type = 'video/mp4'
+
+        return {
+            'chunks': response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+            'size': size,
+            'media_type': media_type,
+            'close': response.close,
+        }
+
+    def get_video_stream_for_prompt(self, prompt: str) -> Optional[Dict]:
+        """
+        Like get_video_for_prompt, but returns an open stream instead of a file.
+
+        Returns:
+            Dict with 'stream' (see open_video_stream) and 'metadata', or None
+        """
+        category = self._category_for_prompt(prompt)
+        for video in self._pick_candidates(category):
+            stream = self.open_video_stream(video['url'])
+            if stream:
+                return {'stream': stream, 'metadata': self._selected_metadata(video, category)}
+
+        logger.warning("No streamable CivitAI video found")
+        return None
 
 
 # Convenience function matching VeoClient interface
@@ -1,5 +1,7 @@
 import os
 import re
+import threading
+from dataclasses import dataclass
 from google.cloud import secretmanager
 import logging
 
@@ -36,16 +38,54 @@ class Config:
         if not cls.REGION:
             raise ValueError("Environment variable REGION is not set.")
 
+def _as_bool(name: str, default: bool = False) -> bool:
+    """Parse a boolean env var ("1", "true", "yes", "on" - any case)."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True, slots=True)
+class RuntimeFlags:
+    """Per-run feature flags, parsed from the environment once at import."""
+    force_post: bool
+    force_video: bool
+    run_cleanup: bool
+    use_langgraph: bool
+    verify_twitter_creds: bool
+
+    @classmethod
+    def from_env(cls) -> "RuntimeFlags":
+        return cls(
+            force_post=_as_bool("FORCE_POST"),
+            force_video=_as_bool("FORCE_VIDEO"),
+            run_cleanup=_as_bool("RUN_CLEANUP", True),
+            use_langgraph=_as_bool("USE_LANGGRAPH", True),
+            verify_twitter_creds=_as_bool("VERIFY_TWITTER_CREDS"),
+        )
+
+
+FLAGS = RuntimeFlags.from_env()
+
 # Global client to avoid re-initialization
 _secret_client = None
+_secret_client_lock = threading.Lock()
+
+# Secrets fetched this process, keyed by (project_id, secret_id)
+_secret_cache = {}
 
-def get_secret(secret_id: str, project_id: str = None) -> str:
+def get_secret(secret_id: str, project_id: str = None, refresh: bool = False) -> str:
     """
     Fetches a secret from Google Cloud Secret Manager.
 
+    Values are cached for the life of the process, so repeated lookups
+    don't cost another Secret Manager round-trip. Safe to call from threads.
+
     Args:
         secret_id: The secret name (without project/version path)
         project_id: Optional GCP project ID, defaults to Config.PROJECT_ID
+        refresh: Bypass the cache and fetch the latest version (e.g. after rotation)
 
     Returns:
         The secret value as a string
@@ -61,14 +101,22 @@ def get_secret(secret_id: str, project_id: str = None) -> str:
     if not project_id:
         raise ValueError("PROJECT_ID environment variable is not set.")
 
+    cache_key = (project_id, secret_id)
+    if not refresh and cache_key in _secret_cache:
+        return _secret_cache[cache_key]
+
     if _secret_client is None:
-        _secret_client = secretmanager.SecretManagerServiceClient()
+        with _secret_client_lock:
+            if _secret_client is None:
+                _secret_client = secretmanager.SecretManagerServiceClient()
 
     name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
 
     try:
         response = _secret_client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
+        value = response.payload.data.decode("UTF-8")
+        _secret_cache[cache_key] = value
+        return value
     except Exception as e:
         # Sanitize error message to prevent credential leakage
         safe_error = _sanitize_error(e)
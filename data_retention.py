@@ -19,6 +19,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from google.cloud import firestore
 import pytz
+from toon_helper import toon
 
 logger = logging.getLogger(__name__)
 
@@ -238,6 +239,13 @@ class AIContextManager:
         self.project_id = project_id
         self.db = firestore.Client(project=project_id)
 
+        # Trends are optional context - resolve the scraper once, not per prompt
+        try:
+            from trend_scraper import TrendScraper
+            self._scraper_cls = TrendScraper
+        except Exception:
+            self._scraper_cls = None
+
     def get_recent_posts(self, limit: int = 10) -> List[Dict]:
         """Get recent posts for context."""
         posts = []
@@ -271,10 +279,15 @@ class AIContextManager:
                 "avg_posts_per_day": 0
             }
 
-            for i in range(7):
-                date_str = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-                doc = self.db.collection("budget_tracking").document(f"daily_{date_str}").get()
+            # All 7 daily docs in one batched read instead of 7 round trips
+            budget = self.db.collection("budget_tracking")
+            refs = [
+                budget.document(f"daily_{(today - timedelta(days=i)).strftime('%Y-%m-%d')}")
+                for i in range(7)
+            ]
+            field_paths = ["posts_created", "replies_created", "videos_generated"]
 
+            for doc in self.db.get_all(refs, field_paths=field_paths):
                 if doc.exists:
                     data = doc.to_dict()
                     stats["total_posts_7d"] += data.get("posts_created", 0)
@@ -298,8 +311,6 @@ class AIContextManager:
         - What it's been doing
         - Current situation
         """
-        from toon_helper import toon
-
         # Get recent posts
         recent_posts = self.get_recent_posts(5)
 
@@ -308,10 +319,9 @@ class AIContextManager:
 
         # Get trends if requested
         trends_data = []
-        if include_trends:
+        if include_trends and self._scraper_cls:
             try:
-                from trend_scraper import TrendScraper
-                scraper = TrendScraper()
+                scraper = self._scraper_cls()
                 trends_data = scraper.get_all_trends(limit_per_source=3)[:10]
             except Exception:
                 pass
@@ -6,7 +6,6 @@ Uses Twitter API to discover what's popular and analyzes posting patterns.
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-import tweepy
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +73,7 @@ class InfluencerAnalyzer:
 
         if self.bearer_token:
             try:
+                import tweepy  # only needed once a bearer token is configured
                 self.client = tweepy.Client(bearer_token=self.bearer_token)
                 logger.info("✓ Influencer analyzer initialized with Twitter API (FREE TIER - 1 req/15min)")
             except Exception as e:
@@ -181,7 +181,8 @@ class InfluencerAnalyzer:
                 tweets = self.client.search_recent_tweets(
                     query=query,
                     max_results=10,  # Reduced for free tier
-                    tweet_fields=['created_at', 'public_metrics', 'author_id', 'lang'],
+                    # Only fields read below; every query already carries lang:en
+                    tweet_fields=['created_at', 'public_metrics', 'author_id'],
                     user_fields=['name', 'username', 'location', 'description', 'public_metrics'],
                     expansions=['author_id']
                 )
@@ -206,10 +207,6 @@ class InfluencerAnalyzer:
                         }
 
                 for tweet in tweets.data:
-                    # Skip non-English tweets
-                    if tweet.lang and tweet.lang != 'en':
-                        continue
-
                     # Get author info
                     author = users.get(tweet.author_id, {})
 
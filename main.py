@@ -12,16 +12,26 @@ Video source: CivitAI (FREE)
 
 import os
 import sys
+import atexit
 import logging
-import tweepy
-from tenacity import retry, stop_after_attempt, wait_exponential
-from config import Config, get_secret
+import contextlib
+import importlib
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from config import Config, FLAGS
+from twitter_io import (
+    TWEET_LIMIT,
+    get_twitter_api,
+    post_tweet_v2,
+    truncate_tweet,
+    upload_media_stream,
+    upload_media_v1,
+    weighted_len,
+)
 
-# Configuration
-FORCE_POST = os.getenv("FORCE_POST", "false").lower() == "true"
-FORCE_VIDEO = os.getenv("FORCE_VIDEO", "false").lower() == "true"
-RUN_CLEANUP = os.getenv("RUN_CLEANUP", "true").lower() == "true"
-USE_LANGGRAPH = os.getenv("USE_LANGGRAPH", "true").lower() == "true"
+# Configuration (feature flags live in config.FLAGS)
+CLEANUP_EXIT_TIMEOUT = 30  # seconds to let background cleanup finish at exit
 
 # Logging
 logging.basicConfig(
@@ -31,342 +41,389 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Try GCP structured logging
-try:
-    import google.cloud.logging
-    client = google.cloud.logging.Client()
-    client.setup_logging()
-except Exception:
-    pass  # Fall back to standard logging
-
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=4, max=60))
-def post_tweet_v2(client, text, **kwargs):
-    """Post tweet with retry logic."""
-    return client.create_tweet(text=text, **kwargs)
-
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=4, max=60))
-def upload_media_v1(api, filename, **kwargs):
-    """Upload media with retry logic."""
-    return api.media_upload(filename, **kwargs)
-
-
-def get_twitter_api():
-    """Authenticate with Twitter API."""
-    required_secrets = [
-        "TWITTER_CONSUMER_KEY",
-        "TWITTER_CONSUMER_SECRET",
-        "TWITTER_ACCESS_TOKEN",
-        "TWITTER_ACCESS_TOKEN_SECRET"
-    ]
-
-    secrets = {}
-    for secret_id in required_secrets:
-        val = get_secret(secret_id)
-        if not val:
-            raise ValueError(f"Missing required secret: {secret_id}")
-        secrets[secret_id] = val
-
-    auth = tweepy.OAuth1UserHandler(
-        secrets["TWITTER_CONSUMER_KEY"],
-        secrets["TWITTER_CONSUMER_SECRET"],
-        secrets["TWITTER_ACCESS_TOKEN"],
-        secrets["TWITTER_ACCESS_TOKEN_SECRET"]
-    )
-
-    api_v1 = tweepy.API(auth)
-    client_v2 = tweepy.Client(
-        consumer_key=secrets["TWITTER_CONSUMER_KEY"],
-        consumer_secret=secrets["TWITTER_CONSUMER_SECRET"],
-        access_token=secrets["TWITTER_ACCESS_TOKEN"],
-        access_token_secret=secrets["TWITTER_ACCESS_TOKEN_SECRET"]
-    )
-
-    api_v1.verify_credentials()
-    return api_v1, client_v2
+# Record fields our format (and Cloud Logging) never use - skip collecting them per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 
 
-def main():
-    logger.info("=" * 50)
-    logger.info("Phantom AI Agent - POST Mode")
-    logger.info("=" * 50)
+_gcp_logging_done = False
+
+
+def _on_gcp() -> bool:
+    """Cloud Run (K_SERVICE / CLOUD_RUN_JOB), App Engine (GAE_ENV) or another GCP host (GOOGLE_CLOUD_PROJECT)."""
+    return any(os.getenv(name) for name in ("K_SERVICE", "CLOUD_RUN_JOB", "GAE_ENV", "GOOGLE_CLOUD_PROJECT"))
+
+
+def _setup_gcp_logging():
+    """
+    Switch stdout logging to GCP structured JSON (imported lazily, GCP only).
+
+    StructuredLogHandler just writes JSON lines to stdout for the platform's
+    log agent to ingest - no API calls from the process, so it replaces the
+    plain stdout handler rather than running alongside it. Locally and in
+    tests the plain handler stays.
+    """
+    global _gcp_logging_done
+    if _gcp_logging_done or not _on_gcp():
+        return
+    _gcp_logging_done = True
 
-    # 1. Initialize
     try:
-        Config.validate()
-        api_v1, client_v2 = get_twitter_api()
-        logger.info("Twitter API connected")
+        from google.cloud.logging.handlers import StructuredLogHandler
+    except ImportError:
+        return  # Fall back to standard logging
+    logging.root.handlers[:] = [StructuredLogHandler(stream=sys.stdout)]
+
+
+def _run_cleanup():
+    """Run data retention cleanup, logging (not raising) failures."""
+    try:
+        from data_retention import run_cleanup
+        stats = run_cleanup(Config.PROJECT_ID)
+        if stats["total_deleted"] > 0:
+            logger.info("Cleaned up %s old documents", stats['total_deleted'])
     except Exception as e:
-        logger.critical(f"Initialization failed: {e}")
-        sys.exit(1)
+        logger.warning("Cleanup failed (non-critical): %s", e)
+
+
+_cleanup_thread = None
 
-    # 2. Data cleanup
-    if RUN_CLEANUP:
+
+@atexit.register
+def _join_cleanup():
+    """Give background cleanup CLEANUP_EXIT_TIMEOUT seconds to finish before the container goes away."""
+    if _cleanup_thread is not None:
+        _cleanup_thread.join(CLEANUP_EXIT_TIMEOUT)
+
+
+def _start_background_cleanup():
+    """
+    Run cleanup on a daemon thread without blocking the post path.
+
+    The single atexit hook above joins the latest thread; anything left
+    unfinished is picked up by the next run.
+    """
+    global _cleanup_thread
+    if _cleanup_thread is not None and _cleanup_thread.is_alive():
+        logger.info("Cleanup from an earlier run still in progress, not starting another")
+        return
+    _cleanup_thread = threading.Thread(target=_run_cleanup, name="data-cleanup", daemon=True)
+    _cleanup_thread.start()
+
+
+def _preload(module_name: str) -> threading.Thread:
+    """Import a module on a daemon thread; a later import just finds it in sys.modules."""
+    def _import():
         try:
-            from data_retention import run_cleanup
-            stats = run_cleanup(Config.PROJECT_ID)
-            if stats["total_deleted"] > 0:
-                logger.info(f"Cleaned up {stats['total_deleted']} old documents")
+            importlib.import_module(module_name)
         except Exception as e:
-            logger.warning(f"Cleanup failed (non-critical): {e}")
+            logger.debug("Preload of %s failed: %s", module_name, e)  # the real import will raise
+
+    thread = threading.Thread(target=_import, name=f"preload-{module_name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _init_controller():
+    """Create the quota/budget controller."""
+    from ai_agent_controller import AIAgentController
+    return AIAgentController(project_id=Config.PROJECT_ID)
+
+
+def _check_scheduler():
+    """Ask the lightweight scheduler whether now is a good time to post."""
+    from scheduler import should_post_lightweight
+    return should_post_lightweight()
+
+
+def run() -> int:
+    """
+    Run one posting cycle and return the process exit code.
+
+    Returns instead of calling sys.exit() so a warm process can call it
+    repeatedly and keep its imports, cached secrets and Twitter clients.
+    """
+    _setup_gcp_logging()
 
-    # 3. Initialize controller
+    # 1. Validate config (cheap, no I/O)
     try:
-        from ai_agent_controller import AIAgentController
-        controller = AIAgentController(project_id=Config.PROJECT_ID)
-        summary = controller.get_daily_summary()
-        logger.info(f"Today: {summary['posts']} posts, quota: {summary['twitter_quota_used']}")
+        Config.validate()
     except Exception as e:
-        logger.critical(f"Controller init failed: {e}")
-        sys.exit(1)
+        logger.critical("Initialization failed: %s", e)
+        return 1
 
-    # 4. Check if we can post
-    can_post, reason = controller.can_create_post()
-    if not can_post:
-        logger.info(f"Cannot post: {reason}")
-        sys.exit(0)
+    # 2. Data cleanup - off the critical path entirely, only its log line matters
+    if FLAGS.run_cleanup:
+        _start_background_cleanup()
 
-    # 5. Check scheduler (unless forced)
-    if not FORCE_POST:
-        from scheduler import should_post_lightweight
-        should_post, reason = should_post_lightweight()
-        if not should_post:
-            logger.info(f"Scheduler: {reason}")
-            sys.exit(0)
-        logger.info(f"Scheduler approved: {reason}")
+    # 3. Check scheduler first (unless forced) - it's pure local time math, and
+    # a "not now" run then never touches Firestore
+    if FLAGS.force_post:
+        reason = "FORCE_POST enabled"
     else:
-        logger.info("FORCE_POST enabled")
+        should_post, reason = _check_scheduler()
+        if not should_post:
+            logger.info("Scheduler: %s", reason)
+            return 0
+
+    # Brain (Vertex AI SDK) is the heaviest import, and video posts need the
+    # CivitAI downloader - import both while the controller loads
+    _preload("brain")
+    _preload("civitai_downloader")
+
+    # 4. Initialize controller
+    try:
+        controller = _init_controller()
+        summary = controller.get_daily_summary()
+    except Exception as e:
+        logger.critical("Controller init failed: %s", e)
+        return 1
+
+    # 5. Check if we can post
+    can_post, quota_reason = controller.can_create_post()
+    if not can_post:
+        logger.info("Cannot post: %s", quota_reason)
+        return 0
+
+    # One structured startup record instead of a line per fact
+    startup_ctx = {
+        "mode": "post",
+        "posts": summary['posts'],
+        "twitter_quota_used": summary['twitter_quota_used'],
+        "force_post": FLAGS.force_post,
+        "force_video": FLAGS.force_video,
+        "scheduler": reason,
+    }
+    logger.info("Phantom AI Agent - POST Mode | today: %s posts, quota: %s | %s",
+                summary['posts'], summary['twitter_quota_used'], reason,
+                extra={"json_fields": startup_ctx})
+
+    # 6. Connect Twitter (tweepy is only imported once we know we'll post) while Brain initializes
+    executor = ThreadPoolExecutor(max_workers=1)
+    twitter_future = executor.submit(get_twitter_api)
+    executor.shutdown(wait=False)
 
-    # 6. Initialize Brain
     logger.info("Initializing Brain...")
     try:
         from brain import AgentBrain
         brain = AgentBrain()
     except Exception as e:
-        logger.critical(f"Brain init failed: {e}")
-        sys.exit(1)
+        logger.critical("Brain init failed: %s", e)
+        return 1
+
+    try:
+        api_v1, client_v2 = twitter_future.result()
+        logger.info("Twitter API connected")
+    except Exception as e:
+        logger.critical("Initialization failed: %s", e)
+        return 1
 
     # 7. Get content strategy (using LangGraph agent or direct)
     try:
-        if USE_LANGGRAPH:
+        if FLAGS.use_langgraph:
             logger.info("Running LangGraph agent workflow...")
             from agent_graph import run_agent
             result = run_agent(
                 brain=brain,
                 controller=controller,
                 project_id=Config.PROJECT_ID,
-                force_video=FORCE_VIDEO
+                force_video=FLAGS.force_video
             )
             if not result["success"] or not result["strategy"]:
-                logger.info(f"Agent workflow: {result.get('error', 'No content')}")
-                sys.exit(0)
+                logger.info("Agent workflow: %s", result.get('error', 'No content'))
+                return 0
             strategy = result["strategy"]
-            logger.info(f"Agent decided: {result['content_type']} on '{result.get('topic', 'N/A')}'")
+            logger.info("Agent decided: %s on '%s'", result['content_type'], result.get('topic', 'N/A'))
         else:
             # Direct brain call (fallback)
-            strategy = brain.get_strategy(force_video=FORCE_VIDEO)
+            strategy = brain.get_strategy(force_video=FLAGS.force_video)
             if strategy is None:
                 logger.info("No quality content available - skipping")
-                sys.exit(0)
-        logger.info(f"Strategy: {strategy['type']}")
+                return 0
+        logger.info("Strategy: %s", strategy['type'])
     except Exception as e:
-        logger.error(f"Strategy failed: {e}")
-        sys.exit(1)
+        logger.error("Strategy failed: %s", e)
+        return 1
 
     # 8. Execute post
     try:
-        post_type = strategy["type"]
-
-        if post_type == "video":
-            post_video(api_v1, client_v2, brain, controller, strategy)
-
-        elif post_type == "infographic":
-            post_infographic(api_v1, client_v2, brain, controller, strategy)
-
-        elif post_type == "meme":
-            post_meme(api_v1, client_v2, brain, controller, strategy)
-
-        elif post_type == "image":
-            post_image(api_v1, client_v2, brain, controller, strategy)
-
-        elif post_type == "thought":
-            post_thought(client_v2, brain, controller, strategy)
-
-        else:  # text, thread
-            post_text(client_v2, brain, controller, strategy)
+        handler = POST_HANDLERS.get(strategy["type"], post_text)  # text, thread
+        handler(api_v1, client_v2, brain, controller, strategy)
 
         logger.info("Post complete!")
-        sys.exit(0)
+        return 0
 
     except Exception as e:
-        logger.error(f"Post failed: {e}")
-        sys.exit(1)
+        logger.error("Post failed: %s", e)
+        return 1
 
 
-def post_video(api_v1, client_v2, brain, controller, strategy):
-    """Post video content."""
-    video_path = None
+def _safe_unlink(path):
+    """Remove a temp media file if there is one (EAFP - no exists() stat first)."""
+    if not path:
+        return
     try:
-        from civitai_downloader import CivitAIVideoDownloader
-        downloader = CivitAIVideoDownloader()
-        video_result = downloader.get_video_for_prompt(strategy.get("video_prompt", ""))
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+    except OSError as e:
+        logger.warning("Failed to clean up media file %s: %s", path, e)
 
-        if not video_result:
-            raise RuntimeError("CivitAI download failed")
 
-        video_path = video_result.get('path')
-        video_metadata = video_result.get('metadata', {})
+@contextlib.contextmanager
+def _ephemeral_file(path=None):
+    """Holder for a temp media path (set .path once known) that is unlinked on exit."""
+    holder = types.SimpleNamespace(path=path)
+    try:
+        yield holder
+    finally:
+        _safe_unlink(holder.path)
 
-        if not video_path or not os.path.exists(video_path):
-            raise RuntimeError("CivitAI download failed - no video path")
 
-        # Generate caption based on ACTUAL video metadata, not generic prompt
-        content = brain.generate_video_caption(video_metadata)
-        if not content:
-            # Fallback to strategy content if caption generation fails
-            content = strategy.get("content", "")
-        if not content:
-            raise ValueError("Missing content for video post")
+def post_video(api_v1, client_v2, brain, controller, strategy):
+    """Post video content."""
+    video_stream = None
+    with _ephemeral_file() as video_file:
+        try:
+            from civitai_downloader import CivitAIVideoDownloader
+            downloader = CivitAIVideoDownloader()
+            video_prompt = strategy.get("video_prompt", "")
+
+            # The with-block waits out a running upload before any fallback or
+            # cleanup, so the stream isn't closed and the file isn't unlinked under it
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Prefer piping the CivitAI body straight into the chunked upload; it
+                # needs Content-Length up front, so fall back to a temp file without it
+                video_result = downloader.get_video_stream_for_prompt(video_prompt)
+                if video_result:
+                    video_stream = video_result['stream']
+                    upload_future = executor.submit(
+                        upload_media_stream, api_v1, video_stream['chunks'], video_stream['size'],
+                        video_stream['media_type'], media_category="tweet_video"
+                    )
+                else:
+                    video_result = downloader.get_video_for_prompt(video_prompt)
+                    if not video_result:
+                        raise RuntimeError("CivitAI download failed")
+
+                    video_file.path = video_result.get('path')
+                    if not video_file.path:
+                        raise RuntimeError("CivitAI download failed - no video path")
+
+                    # Start the (multi-second) chunked upload now - it doesn't depend on the caption
+                    upload_future = executor.submit(
+                        upload_media_v1, api_v1, video_file.path, chunked=True, media_category="tweet_video"
+                    )
+                video_metadata = video_result.get('metadata', {})
+
+                # Generate caption based on ACTUAL video metadata, not generic prompt
+                content = brain.generate_video_caption(video_metadata)
+                if not content:
+                    # Fallback to strategy content if caption generation fails
+                    content = strategy.get("content", "")
+                if not content:
+                    raise ValueError("Missing content for video post")
 
-        media = upload_media_v1(api_v1, video_path, chunked=True, media_category="tweet_video")
-        if not media or not hasattr(media, 'media_id'):
-            raise RuntimeError("Media upload returned invalid object")
+                media = upload_future.result()
+            if not media or not hasattr(media, 'media_id'):
+                raise RuntimeError("Media upload returned invalid object")
 
-        response = post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
+            response = post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
 
-        logger.info(f"Video posted: {response.data['id']}")
-        strategy['content'] = content  # Update for logging
-        brain.log_post(strategy, success=True)
-        controller.record_post_created("video")
+            logger.info("Video posted: %s", response.data['id'])
+            strategy['content'] = content  # Update for logging
+            controller.record_post_and_log(strategy, True, "video")
 
-    except Exception as e:
-        logger.error(f"Video failed: {e}")
-        post_fallback_text(client_v2, brain, controller, strategy, e)
+        except Exception as e:
+            logger.error("Video failed: %s", e)
+            post_fallback_text(client_v2, brain, controller, strategy, e)
 
-    finally:
-        if video_path and os.path.exists(video_path):
-            try:
-                os.remove(video_path)
-            except Exception as e:
-                logger.warning(f"Failed to clean up video file {video_path}: {e}")
+        finally:
+            if video_stream:
+                video_stream['close']()
 
 
 def post_infographic(api_v1, client_v2, brain, controller, strategy):
     """Post infographic content."""
-    image_path = None
-    try:
-        topic = strategy.get("topic", "Tech")
-        image_prompt = strategy.get("image_prompt") or f"Professional infographic about {topic}"
-        image_path = brain.generate_image(image_prompt)
-
-        content = strategy.get("content", "")
-        if not content:
-            raise ValueError("Missing content in strategy")
+    with _ephemeral_file() as image_file:
+        try:
+            topic = strategy.get("topic", "Tech")
+            image_prompt = strategy.get("image_prompt") or f"Professional infographic about {topic}"
+            image_file.path = brain.generate_image(image_prompt)
 
-        media = upload_media_v1(api_v1, image_path)
-        post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
+            content = strategy.get("content", "")
+            if not content:
+                raise ValueError("Missing content in strategy")
 
-        logger.info("Infographic posted")
-        brain.log_post(strategy, success=True)
-        controller.record_post_created("infographic")
+            media = upload_media_v1(api_v1, image_file.path)
+            post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
 
-    except Exception as e:
-        logger.error(f"Infographic failed: {e}")
-        post_fallback_text(client_v2, brain, controller, strategy, e)
+            logger.info("Infographic posted")
+            controller.record_post_and_log(strategy, True, "infographic")
 
-    finally:
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except Exception as e:
-                logger.warning(f"Failed to clean up image file {image_path}: {e}")
+        except Exception as e:
+            logger.error("Infographic failed: %s", e)
+            post_fallback_text(client_v2, brain, controller, strategy, e)
 
 
 def post_meme(api_v1, client_v2, brain, controller, strategy):
     """Post meme content."""
-    image_path = strategy.get("meme_local_path")
-    try:
-        if image_path and os.path.exists(image_path):
-            is_gif = image_path.lower().endswith('.gif')
-            if is_gif:
-                media = upload_media_v1(api_v1, image_path, chunked=True, media_category="tweet_gif")
-            else:
-                media = upload_media_v1(api_v1, image_path)
+    with _ephemeral_file(strategy.get("meme_local_path")) as image_file:
+        image_path = image_file.path
+        try:
+            if image_path and os.path.exists(image_path):
+                is_gif = image_path.lower().endswith('.gif')
+                if is_gif:
+                    media = upload_media_v1(api_v1, image_path, chunked=True, media_category="tweet_gif")
+                else:
+                    media = upload_media_v1(api_v1, image_path)
 
-            post_tweet_v2(client_v2, text=strategy.get("content", ""), media_ids=[media.media_id])
-            logger.info("Meme posted")
-            brain.log_post(strategy, success=True)
-            controller.record_post_created("meme")
-        else:
-            # No image - post as text
-            content = strategy.get("content", "")
-            if isinstance(content, list):
+                post_tweet_v2(client_v2, text=strategy.get("content", ""), media_ids=[media.media_id])
+                logger.info("Meme posted")
+                controller.record_post_and_log(strategy, True, "meme")
+            else:
+                # No image - post as text
+                content = strategy.get("content", "")
+                if isinstance(content, list):
+                    if not content:
+                        raise ValueError("Empty content list in strategy")
+                    content = content[0]
                 if not content:
-                    raise ValueError("Empty content list in strategy")
-                content = content[0]
-            if not content:
-                raise ValueError("Missing content in strategy")
-            post_tweet_v2(client_v2, text=content)
-            logger.info("Meme text posted")
-            brain.log_post(strategy, success=True)
-            controller.record_post_created("text")
+                    raise ValueError("Missing content in strategy")
+                post_tweet_v2(client_v2, text=content)
+                logger.info("Meme text posted")
+                controller.record_post_and_log(strategy, True, "text")
 
-    except Exception as e:
-        logger.error(f"Meme failed: {e}")
-        content = strategy.get("content", "")
-        if isinstance(content, list):
-            content = content[0] if content else ""
-        if not content:
-            raise
-        try:
-            post_tweet_v2(client_v2, text=content)
-            brain.log_post(strategy, success=True, error=str(e))
-            controller.record_post_created("text")
-        except Exception:
-            raise
-
-    finally:
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except Exception as e:
-                logger.warning(f"Failed to clean up meme file {image_path}: {e}")
+        except Exception as e:
+            logger.error("Meme failed: %s", e)
+            post_fallback_text(client_v2, brain, controller, strategy, e)
 
 
 def post_image(api_v1, client_v2, brain, controller, strategy):
     """Post AI-generated image."""
-    image_path = None
-    try:
-        image_prompt = strategy.get("image_prompt")
-        if not image_prompt:
-            raise ValueError("Missing image_prompt")
-
-        image_path = brain.generate_image(image_prompt)
-        content = strategy.get("content", "")
-        if not content:
-            raise ValueError("Missing content in strategy")
+    with _ephemeral_file() as image_file:
+        try:
+            image_prompt = strategy.get("image_prompt")
+            if not image_prompt:
+                raise ValueError("Missing image_prompt")
 
-        media = upload_media_v1(api_v1, image_path)
-        post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
+            image_file.path = brain.generate_image(image_prompt)
+            content = strategy.get("content", "")
+            if not content:
+                raise ValueError("Missing content in strategy")
 
-        logger.info("Image posted")
-        brain.log_post(strategy, success=True)
-        controller.record_post_created("image")
+            media = upload_media_v1(api_v1, image_file.path)
+            post_tweet_v2(client_v2, text=content, media_ids=[media.media_id])
 
-    except Exception as e:
-        logger.error(f"Image failed: {e}")
-        post_fallback_text(client_v2, brain, controller, strategy, e)
+            logger.info("Image posted")
+            controller.record_post_and_log(strategy, True, "image")
 
-    finally:
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except Exception as e:
-                logger.warning(f"Failed to clean up image file {image_path}: {e}")
+        except Exception as e:
+            logger.error("Image failed: %s", e)
+            post_fallback_text(client_v2, brain, controller, strategy, e)
 
 
-def post_thought(client_v2, brain, controller, strategy):
+def post_thought(api_v1, client_v2, brain, controller, strategy):
     """Post AI thought/reflection."""
     text = strategy.get("content", "")
     if isinstance(text, list):
@@ -376,40 +433,41 @@ def post_thought(client_v2, brain, controller, strategy):
     if not text:
         raise ValueError("Missing content in strategy")
 
-    if len(text) > 280:
-        text = text[:277] + "..."
-
-    response = post_tweet_v2(client_v2, text=text)
-    logger.info(f"Thought posted: {response.data['id']}")
-    brain.log_post(strategy, success=True)
-    controller.record_post_created("text")
+    response = post_tweet_v2(client_v2, text=truncate_tweet(text))
+    logger.info("Thought posted: %s", response.data['id'])
+    controller.record_post_and_log(strategy, True, "text")
 
 
-def post_text(client_v2, brain, controller, strategy):
+def post_text(api_v1, client_v2, brain, controller, strategy):
     """Post text/thread content."""
     tweets = strategy.get("content", "")
     if not tweets:
         raise ValueError("Missing content in strategy")
-    if isinstance(tweets, str):
+    if isinstance(tweets, (str, bytes, bytearray)):
         tweets = [tweets]
-    if not tweets:
-        raise ValueError("Empty content list in strategy")
 
-    previous_id = None
-    for tweet_text in tweets:
-        if len(tweet_text) > 280:
-            tweet_text = tweet_text[:277] + "..."
-
-        if previous_id:
-            response = post_tweet_v2(client_v2, text=tweet_text, in_reply_to_tweet_id=previous_id)
-        else:
-            response = post_tweet_v2(client_v2, text=tweet_text)
+    # Truncate everything up front so the posting loop is just the API chain
+    tweets = list(map(truncate_tweet, tweets))
 
+    # Each reply needs the previous tweet's ID, so the chain is inherently serial
+    previous_id = post_tweet_v2(client_v2, text=tweets[0]).data['id']
+    for tweet_text in tweets[1:]:
+        response = post_tweet_v2(client_v2, text=tweet_text, in_reply_to_tweet_id=previous_id)
         previous_id = response.data['id']
 
-    logger.info(f"Text posted: {previous_id}")
-    brain.log_post(strategy, success=True)
-    controller.record_post_created("text")
+    logger.info("Text posted: %s", previous_id)
+    controller.record_post_and_log(strategy, True, "text")
+
+
+def _compose_tweet(caption, source_url=None) -> str:
+    """Caption (clipped once to fit) plus an optional source URL after a blank line."""
+    if not source_url:
+        return truncate_tweet(caption)
+    # Caption gets whatever room the URL and blank line leave; just post the URL if that's too little
+    max_len = TWEET_LIMIT - weighted_len(source_url) - 2
+    if max_len <= 20:
+        return source_url[:TWEET_LIMIT]
+    return f"{truncate_tweet(caption, max_len)}\n\n{source_url}"
 
 
 def post_fallback_text(client_v2, brain, controller, strategy, original_error):
@@ -421,29 +479,29 @@ def post_fallback_text(client_v2, brain, controller, strategy, original_error):
         if not caption:
             raise ValueError("No content for fallback text")
 
-        source_url = strategy.get('source_url')
-
-        if source_url:
-            text = f"{caption}\n\n{source_url}"
-            if len(text) > 280:
-                max_len = max(20, 280 - len(source_url) - 4)  # Ensure minimum caption length
-                if max_len <= 20:
-                    text = source_url[:280]  # Just post URL if no room for caption
-                else:
-                    text = f"{caption[:max_len]}...\n\n{source_url}"
-        else:
-            text = caption if len(caption) <= 280 else caption[:277] + "..."
-
-        post_tweet_v2(client_v2, text=text)
+        post_tweet_v2(client_v2, text=_compose_tweet(caption, strategy.get('source_url')))
         logger.info("Fallback text posted")
-        brain.log_post(strategy, success=True, error=f"Media failed: {original_error}")
-        controller.record_post_created("text")
+        controller.record_post_and_log(strategy, True, "text", error=f"Media failed: {original_error}")
 
     except Exception as e:
-        logger.error(f"Fallback also failed: {e}")
-        brain.log_post(strategy, success=False, error=str(original_error))
+        logger.error("Fallback also failed: %s", e)
+        controller.record_post_and_log(strategy, False, "text", error=str(original_error))
         raise
 
 
+# Strategy type -> poster; anything unlisted (text, thread) goes to post_text
+POST_HANDLERS = {
+    "video": post_video,
+    "infographic": post_infographic,
+    "meme": post_meme,
+    "image": post_image,
+    "thought": post_thought,
+}
+
+
+def main():
+    sys.exit(run())
+
+
 if __name__ == "__main__":
     main()
@@ -9,8 +9,11 @@ Enables the AI to:
 - Make informed engagement decisions
 """
 
+import hashlib
 import logging
-from typing import List, Dict, Optional
+from collections import Counter, OrderedDict
+from functools import cached_property
+from typing import List, Dict, Optional, Tuple
 from google.cloud import firestore
 from vertexai.language_models import TextEmbeddingModel
 import datetime
@@ -18,6 +21,12 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Optional SIMD similarity kernels (int8 cosine) - NumPy float32 is the fallback
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
 
 class VectorMemory:
     """
@@ -25,44 +34,218 @@ class VectorMemory:
     Uses Vertex AI Text Embeddings to store and retrieve contextual memories.
     """
 
-    def __init__(self, project_id: str):
+    # Similarity search scope: the newest CACHE_MAX_ROWS memories within the
+    # search's window, CACHE_WINDOW when the caller passes no `since`. So an
+    # unscoped search never sees memories older than 30 days (cleanup_old_memories
+    # deletes them at that age anyway) or beyond the newest 2000 in that window.
+    # 768 B per row as int8, 3 KB as float32; brute force over 2k rows is ~ms.
+    CACHE_MAX_ROWS = 2000
+    CACHE_WINDOW = datetime.timedelta(days=30)
+
+    # Embeddings kept per exact text (LRU) - the same topic is often embedded several times per run
+    EMBEDDING_CACHE_SIZE = 4096
+
+    # Texts per get_embeddings() request (Vertex AI accepts up to 250)
+    EMBEDDING_BATCH_SIZE = 250
+
+    # Tweet ids known to be stored (LRU) so has_interacted_with can skip Firestore
+    SEEN_IDS_MAX = 10000
+
+    # Field projections - history/stats readers never need the embedding payload
+    SUMMARY_FIELDS = ["tweet_id", "author", "content", "interaction_type", "ai_response", "timestamp", "metadata"]
+    EMBEDDING_FIELDS = ["embedding", "embedding_i8", "embedding_scale", "embedding_dim"]
+
+    def __init__(self, project_id: str, db: Optional[firestore.Client] = None):
         self.project_id = project_id
-        self.db = firestore.Client(project=project_id)
+        # Reuse the caller's client (and its gRPC channel) when given one
+        self.db = db or firestore.Client(project=project_id)
         self.collection_name = "ai_memory"
 
-        # Initialize embedding model
+        # Warm copy of stored memories + their normalized float32 embedding matrix,
+        # loaded on first search and appended by store_interaction
+        self._cache: Optional[List[Dict]] = None
+        self._cache_matrix: Optional[np.ndarray] = None
+        # (interaction_type, since) the warm cache was loaded for
+        self._cache_scope: Optional[Tuple[Optional[str], datetime.datetime]] = None
+        self._embedding_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._seen_ids: "OrderedDict[str, bool]" = OrderedDict()
+
+    @cached_property
+    def embedding_model(self) -> Optional[TextEmbeddingModel]:
+        """Embedding model, loaded on first use - runs that never embed skip the lookup."""
         try:
-            self.embedding_model = TextEmbeddingModel.from_pretrained("text-embedding-004")
+            model = TextEmbeddingModel.from_pretrained("text-embedding-004")
             logger.info("Initialized text-embedding-004 model for memory system")
+            return model
         except Exception as e:
             logger.warning(f"Could not initialize embedding model: {e}")
-            self.embedding_model = None
+            return None
 
     def _generate_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding vector for text."""
-        if not self.embedding_model:
-            return None
-
-        try:
-            embeddings = self.embedding_model.get_embeddings([text])
-            return embeddings[0].values
-        except Exception as e:
-            logger.error(f"Failed to generate embedding: {e}")
-            return None
-
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        vec1_np = np.array(vec1)
-        vec2_np = np.array(vec2)
+        return self._generate_embeddings_batch([text])[0]
 
-        dot_product = np.dot(vec1_np, vec2_np)
-        norm1 = np.linalg.norm(vec1_np)
-        norm2 = np.linalg.norm(vec2_np)
+    def _generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed many texts with as few Vertex AI calls as possible.
 
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        Cached texts are answered locally, the rest go out EMBEDDING_BATCH_SIZE
+        per request. Vectors come back L2-normalized, so cosine similarity
+        against them is a plain dot product. Entries are None where embedding
+        failed.
+        """
+        if not self.embedding_model:
+            return [None] * len(texts)
+
+        keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in self._embedding_cache:
+                self._embedding_cache.move_to_end(key)
+            else:
+                missing.setdefault(key, text)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.EMBEDDING_BATCH_SIZE):
+            chunk = pending[start:start + self.EMBEDDING_BATCH_SIZE]
+            try:
+                embeddings = self.embedding_model.get_embeddings([text for _, text in chunk])
+            except Exception as e:
+                logger.error(f"Failed to generate embedding: {e}")
+                continue
+            for (key, _), embedding in zip(chunk, embeddings):
+                vector = np.asarray(embedding.values, dtype=np.float32)
+                self._embedding_cache[key] = (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+        results = [self._embedding_cache.get(key) for key in keys]
+        while len(self._embedding_cache) > self.EMBEDDING_CACHE_SIZE:
+            self._embedding_cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _int8_scale(vector: np.ndarray) -> float:
+        """Factor that maps the vector's largest component onto 127."""
+        return 127.0 / max(float(np.abs(vector).max(initial=0.0)), 1e-8)
+
+    @classmethod
+    def _quantize(cls, vector) -> np.ndarray:
+        """Scale a vector into int8 (cosine doesn't care about the scale factor)."""
+        vector = np.asarray(vector, dtype=np.float32)
+        return np.round(vector * cls._int8_scale(vector)).astype(np.int8)
+
+    @staticmethod
+    def _embedding_of(memory: Dict) -> Optional[np.ndarray]:
+        """A stored embedding as float32 - int8 (embedding_i8) or legacy float list."""
+        if memory.get("embedding_i8"):
+            quantized = np.frombuffer(memory["embedding_i8"], dtype=np.int8)
+            return quantized.astype(np.float32) / memory.get("embedding_scale", 1.0)
+        if memory.get("embedding"):
+            return np.asarray(memory["embedding"], dtype=np.float32)
+        return None
+
+    @classmethod
+    def _stack(cls, vectors: List[np.ndarray]) -> np.ndarray:
+        """
+        Search matrix for a list of equal-length vectors: int8 rows when SimSIMD
+        is available, otherwise L2-normalized float32 rows for a plain matmul.
+        """
+        if simsimd is not None:
+            return np.stack([cls._quantize(vector) for vector in vectors])
+        return cls._normalize_rows(np.stack(vectors).astype(np.float32))
+
+    @classmethod
+    def _similarities(cls, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a unit-length query against every row of a _stack() matrix."""
+        if matrix.dtype == np.int8:
+            distances = simsimd.cdist(cls._quantize(query)[np.newaxis, :], matrix, metric="cosine")
+            return 1.0 - np.asarray(distances, dtype=np.float32)[0]
+        return matrix @ query
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize each row in place (zero rows stay zero)."""
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    @staticmethod
+    def _top_matches(similarities: np.ndarray, limit: int, min_similarity: float) -> np.ndarray:
+        """Indices of the best `limit` scores at or above min_similarity, best first."""
+        candidates = np.flatnonzero(similarities >= min_similarity)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-similarities[candidates], limit)[:limit]]
+        return candidates[np.argsort(-similarities[candidates], kind="stable")]
+
+    def _cache_covers(self, interaction_type: Optional[str], since: datetime.datetime) -> bool:
+        if self._cache is None or self._cache_scope is None:
+            return False
+        cached_type, cached_since = self._cache_scope
+        return cached_type in (None, interaction_type) and cached_since <= since
 
-        return float(dot_product / (norm1 * norm2))
+    def _ensure_cache_warm(self, interaction_type: Optional[str] = None,
+                           since: Optional[datetime.datetime] = None):
+        """
+        Load the similarity cache for this scope (type + time window) unless the
+        warm one already covers it.
+        """
+        if since is None:
+            since = datetime.datetime.now(datetime.timezone.utc) - self.CACHE_WINDOW
+        if self._cache_covers(interaction_type, since):
+            return
+
+        # Newest first so the cap keeps recent memories; stored oldest-first so
+        # _cache_append's eviction drops the oldest
+        memories_ref = self.db.collection(self.collection_name).select(
+            self.SUMMARY_FIELDS + self.EMBEDDING_FIELDS
+        )
+        if interaction_type is not None:
+            memories_ref = memories_ref.where("interaction_type", "==", interaction_type)
+        memories_ref = memories_ref.where(
+            "timestamp", ">=", since
+        ).order_by(
+            "timestamp", direction=firestore.Query.DESCENDING
+        ).limit(self.CACHE_MAX_ROWS)
+        memories = [doc.to_dict() for doc in memories_ref.stream()]
+        memories.reverse()
+        vectors = [self._embedding_of(memory) for memory in memories]
+
+        # One contiguous matrix needs one dimension - keep the common one.
+        # Rows without an embedding (older interactions) don't get a vote.
+        dims = [len(vector) if vector is not None else 0 for vector in vectors]
+        common = Counter(d for d in dims if d).most_common(1)
+        dim = common[0][0] if common else 0
+        keep = [i for i, d in enumerate(dims) if d == dim and dim]
+        self._cache_scope = (interaction_type, since)
+        self._cache = [memories[i] for i in keep]
+        self._cache_matrix = self._stack([vectors[i] for i in keep]) if keep else None
+        logger.info(f"Warmed memory cache with {len(self._cache)} embeddings")
+
+    def _cache_append(self, memory: Dict):
+        """Add a freshly stored memory to a warm cache (no-op while cold or out of scope)."""
+        if self._cache is None:
+            return
+        cached_type = self._cache_scope[0] if self._cache_scope else None
+        if cached_type is not None and memory.get("interaction_type") != cached_type:
+            return
+        row = self._stack([self._embedding_of(memory)])
+        if self._cache_matrix is None:
+            self._cache_matrix = row
+        elif row.shape[1] != self._cache_matrix.shape[1]:
+            return
+        else:
+            self._cache_matrix = np.vstack((self._cache_matrix, row))
+        self._cache.append(memory)
+
+        if len(self._cache) > self.CACHE_MAX_ROWS:
+            del self._cache[0]
+            self._cache_matrix = self._cache_matrix[1:]
+
+    def invalidate_cache(self):
+        """Drop the similarity cache; the next search reloads it."""
+        self._cache = None
+        self._cache_matrix = None
+        self._cache_scope = None
 
     def store_interaction(
         self,
@@ -90,24 +273,15 @@ class VectorMemory:
         try:
             # Generate embedding for the content
             embedding = self._generate_embedding(content)
-
-            memory_doc = {
-                "tweet_id": tweet_id,
-                "author": author,
-                "content": content,
-                "interaction_type": interaction_type,
-                "ai_response": ai_response,
-                "timestamp": firestore.SERVER_TIMESTAMP,
-                "metadata": metadata or {},
-            }
-
-            if embedding:
-                memory_doc["embedding"] = embedding
-                memory_doc["embedding_dim"] = len(embedding)
+            memory_doc = self._memory_doc(
+                tweet_id, author, content, interaction_type, ai_response, metadata, embedding
+            )
 
             # Store in Firestore
             doc_ref = self.db.collection(self.collection_name).document(tweet_id)
             doc_ref.set(memory_doc)
+            self._cache_stored(memory_doc)
+            self._mark_seen(tweet_id)
 
             logger.info(f"Stored memory for tweet {tweet_id} by @{author}")
             return True
@@ -116,6 +290,79 @@ class VectorMemory:
             logger.error(f"Failed to store interaction: {e}")
             return False
 
+    def store_interactions_bulk(self, items: List[Dict]) -> int:
+        """
+        Store many interactions with batched embedding calls and batched writes.
+
+        Args:
+            items: Dicts with store_interaction's arguments (tweet_id, author,
+                content, interaction_type, and optionally ai_response, metadata)
+
+        Returns:
+            Number of interactions stored
+        """
+        embeddings = self._generate_embeddings_batch([item["content"] for item in items])
+        collection = self.db.collection(self.collection_name)
+
+        stored = 0
+        for start in range(0, len(items), 500):  # Firestore batch limit
+            memory_docs = [
+                self._memory_doc(embedding=embedding, **item)
+                for item, embedding in zip(items[start:start + 500], embeddings[start:start + 500])
+            ]
+            try:
+                batch = self.db.batch()
+                for memory_doc in memory_docs:
+                    batch.set(collection.document(memory_doc["tweet_id"]), memory_doc)
+                batch.commit()
+            except Exception as e:
+                logger.error(f"Failed to store interaction batch: {e}")
+                continue
+
+            for memory_doc in memory_docs:
+                self._cache_stored(memory_doc)
+                self._mark_seen(memory_doc["tweet_id"])
+            stored += len(memory_docs)
+
+        logger.info(f"Stored {stored}/{len(items)} memories in bulk")
+        return stored
+
+    def _memory_doc(
+        self,
+        tweet_id: str,
+        author: str,
+        content: str,
+        interaction_type: str,
+        ai_response: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        embedding: Optional[List[float]] = None
+    ) -> Dict:
+        """Firestore document for one interaction."""
+        memory_doc = {
+            "tweet_id": tweet_id,
+            "author": author,
+            "content": content,
+            "interaction_type": interaction_type,
+            "ai_response": ai_response,
+            "timestamp": firestore.SERVER_TIMESTAMP,
+            "metadata": metadata or {},
+        }
+
+        if embedding:
+            # int8 + scale is 4x smaller than the float list it replaces
+            memory_doc["embedding_i8"] = self._quantize(embedding).tobytes()
+            memory_doc["embedding_scale"] = self._int8_scale(np.asarray(embedding, dtype=np.float32))
+            memory_doc["embedding_dim"] = len(embedding)
+
+        return memory_doc
+
+    def _cache_stored(self, memory_doc: Dict):
+        """Mirror a just-written document into the warm similarity cache."""
+        if memory_doc.get("embedding_dim"):
+            self._cache_append(dict(
+                memory_doc, timestamp=datetime.datetime.now(datetime.timezone.utc)
+            ))
+
     def get_interaction(self, tweet_id: str) -> Optional[Dict]:
         """Retrieve a specific interaction by tweet ID."""
         try:
@@ -127,15 +374,45 @@ class VectorMemory:
             logger.error(f"Failed to retrieve interaction: {e}")
             return None
 
+    def _mark_seen(self, tweet_id: str):
+        self._seen_ids[tweet_id] = True
+        self._seen_ids.move_to_end(tweet_id)
+        if len(self._seen_ids) > self.SEEN_IDS_MAX:
+            self._seen_ids.popitem(last=False)
+
     def has_interacted_with(self, tweet_id: str) -> bool:
         """Check if we've already interacted with this tweet."""
-        return self.get_interaction(tweet_id) is not None
+        if tweet_id in self._seen_ids:
+            self._seen_ids.move_to_end(tweet_id)
+            return True
+
+        # Only positives are remembered - another run may store this tweet later
+        try:
+            doc = self.db.collection(self.collection_name).document(tweet_id).get(field_paths=[])
+        except Exception as e:
+            logger.error(f"Failed to retrieve interaction: {e}")
+            return False
+        if doc.exists:
+            self._mark_seen(tweet_id)
+        return doc.exists
+
+    @staticmethod
+    def _matches_filters(memory: Dict, interaction_type: Optional[str],
+                         since: Optional[datetime.datetime]) -> bool:
+        if interaction_type is not None and memory.get("interaction_type") != interaction_type:
+            return False
+        if since is not None:
+            timestamp = memory.get("timestamp")
+            return isinstance(timestamp, datetime.datetime) and timestamp >= since
+        return True
 
     def find_similar_interactions(
         self,
         query_text: str,
         limit: int = 5,
-        min_similarity: float = 0.7
+        min_similarity: float = 0.7,
+        interaction_type: Optional[str] = None,
+        since: Optional[datetime.datetime] = None
     ) -> List[Dict]:
         """
         Find similar past interactions using vector similarity.
@@ -144,6 +421,9 @@ class VectorMemory:
             query_text: Text to find similar interactions for
             limit: Max number of results
             min_similarity: Minimum similarity threshold (0-1)
+            interaction_type: Only consider memories of this type
+            since: Only consider memories stored at or after this (tz-aware) time;
+                defaults to the last CACHE_WINDOW (30 days)
 
         Returns:
             List of similar interactions with similarity scores
@@ -153,34 +433,94 @@ class VectorMemory:
             return []
 
         try:
-            # Generate query embedding
-            query_embedding = self._generate_embedding(query_text)
-            if not query_embedding:
+            scored = self._score_memories(query_text, interaction_type, since)
+            if scored is None:
                 return []
+            memories, similarities = scored
+
+            return [
+                dict(memories[i], similarity_score=float(similarities[i]))
+                for i in self._top_matches(similarities, limit, min_similarity)
+            ]
+
+        except Exception as e:
+            logger.error(f"Failed to find similar interactions: {e}")
+            return []
 
-            # Retrieve all memories with embeddings
-            # Note: In production, use Vertex AI Vector Search for scale
-            memories_ref = self.db.collection(self.collection_name).where(
-                "embedding_dim", ">", 0
-            ).limit(100)  # Limit to recent 100 for performance
+    def find_best_similar(
+        self,
+        query_text: str,
+        interaction_type: Optional[str] = None,
+        since: Optional[datetime.datetime] = None
+    ) -> Optional[Tuple[float, Dict]]:
+        """
+        Find the single closest past interaction (top-1, no sorting).
 
-            results = []
-            for doc in memories_ref.stream():
-                memory = doc.to_dict()
-                if "embedding" in memory:
-                    similarity = self._cosine_similarity(query_embedding, memory["embedding"])
+        Args:
+            query_text: Text to find the closest interaction for
+            interaction_type: Only consider memories of this type
+            since: Only consider memories stored at or after this (tz-aware) time
 
-                    if similarity >= min_similarity:
-                        memory["similarity_score"] = similarity
-                        results.append(memory)
+        Returns:
+            (similarity_score, memory) or None if nothing matches
+        """
+        if not self.embedding_model:
+            logger.warning("Embedding model not available, cannot find similar interactions")
+            return None
 
-            # Sort by similarity and return top N
-            results.sort(key=lambda x: x["similarity_score"], reverse=True)
-            return results[:limit]
+        try:
+            scored = self._score_memories(query_text, interaction_type, since)
+            if scored is None:
+                return None
+            memories, similarities = scored
+            if not len(similarities):
+                return None
+
+            best = int(similarities.argmax())
+            score = float(similarities[best])
+            if score == -np.inf:
+                return None
+            return score, memories[best]
 
         except Exception as e:
-            logger.error(f"Failed to find similar interactions: {e}")
-            return []
+            logger.error(f"Failed to find best similar interaction: {e}")
+            return None
+
+    def _score_memories(
+        self,
+        query_text: str,
+        interaction_type: Optional[str],
+        since: Optional[datetime.datetime]
+    ) -> Optional[Tuple[List[Dict], np.ndarray]]:
+        """Embed the query and score it against every candidate memory.
+
+        Memories excluded by the filters score -inf, so callers can rank
+        the result without re-checking them.
+        """
+        query_embedding = self._generate_embedding(query_text)
+        if not query_embedding:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        filtered = interaction_type is not None or since is not None
+        self._ensure_cache_warm(interaction_type, since)
+        memories, matrix = self._cache, self._cache_matrix
+        if matrix is None or matrix.shape[1] != len(query):
+            return None
+
+        # All similarities in one batched call against the stacked (N, D) matrix
+        similarities = self._similarities(matrix, query)
+
+        # Filters apply before ranking, so `limit` counts only matching memories
+        if filtered:
+            mask = np.fromiter(
+                (self._matches_filters(memory, interaction_type, since) for memory in memories),
+                dtype=bool, count=len(memories)
+            )
+            similarities = np.where(mask, similarities, -np.inf)
+
+        return memories, similarities
 
     def get_user_interaction_history(
         self,
@@ -200,6 +540,7 @@ class VectorMemory:
         try:
             interactions = (
                 self.db.collection(self.collection_name)
+                .select(self.SUMMARY_FIELDS)
                 .where("author", "==", username)
                 .order_by("timestamp", direction=firestore.Query.DESCENDING)
                 .limit(limit)
@@ -212,11 +553,16 @@ class VectorMemory:
             logger.error(f"Failed to get user history: {e}")
             return []
 
+    @staticmethod
+    def _count(query) -> int:
+        """Server-side count() aggregation - one integer over the wire, no documents."""
+        return int(query.count().get()[0][0].value)
+
     def get_interaction_stats(self) -> Dict:
         """Get statistics about stored interactions."""
         try:
             total_ref = self.db.collection(self.collection_name)
-            total_count = len(list(total_ref.limit(1000).stream()))
+            total_count = self._count(total_ref)
 
             # Count by type
             stats = {
@@ -227,15 +573,13 @@ class VectorMemory:
 
             # Get type breakdown
             for interaction_type in ["reply", "mention", "outreach"]:
-                count = len(list(
-                    total_ref.where("interaction_type", "==", interaction_type).limit(100).stream()
-                ))
-                stats["by_type"][interaction_type] = count
+                stats["by_type"][interaction_type] = self._count(
+                    total_ref.where("interaction_type", "==", interaction_type)
+                )
 
             # Count recent interactions (last 24 hours)
             yesterday = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
-            recent = total_ref.where("timestamp", ">=", yesterday).stream()
-            stats["recent_count_24h"] = len(list(recent))
+            stats["recent_count_24h"] = self._count(total_ref.where("timestamp", ">=", yesterday))
 
             return stats
 
@@ -276,27 +620,29 @@ class VectorMemory:
         try:
             cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_old)
 
-            old_docs = (
+            # One keys-only page of 500 (the Firestore batch limit) at a time;
+            # deleted docs drop out of the query, so re-running it is the cursor
+            old_docs_query = (
                 self.db.collection(self.collection_name)
                 .where("timestamp", "<", cutoff_date)
-                .stream()
+                .select([])  # keys only - we just need doc.reference
+                .order_by("timestamp")
+                .limit(500)
             )
 
             deleted_count = 0
-            batch = self.db.batch()
-
-            for doc in old_docs:
-                batch.delete(doc.reference)
-                deleted_count += 1
-
-                # Commit in batches of 500 (Firestore limit)
-                if deleted_count % 500 == 0:
-                    batch.commit()
-                    batch = self.db.batch()
-
-            # Commit remaining
-            if deleted_count % 500 != 0:
+            while True:
+                page = list(old_docs_query.stream())
+                if not page:
+                    break
+
+                batch = self.db.batch()
+                for doc in page:
+                    batch.delete(doc.reference)
                 batch.commit()
+                deleted_count += len(page)
+                self.invalidate_cache()
+                self._seen_ids.clear()
 
             logger.info(f"Cleaned up {deleted_count} old memories (>{days_old} days)")
             return deleted_count
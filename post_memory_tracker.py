@@ -8,7 +8,9 @@ Uses vector memory to:
 """
 
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
+import pytz
 from memory_system import VectorMemory
 
 logger = logging.getLogger(__name__)
@@ -86,24 +88,17 @@ class PostMemoryTracker:
             List of similar posts
         """
         try:
-            similar = self.vector_memory.find_similar_interactions(
+            # Only our own posts from recent days, filtered before top-k
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
+
+            recent_similar = self.vector_memory.find_similar_interactions(
                 query_text=topic,
                 limit=5,
-                min_similarity=min_similarity
+                min_similarity=min_similarity,
+                interaction_type="posted",
+                since=cutoff
             )
 
-            # Filter to only our own posts from recent days
-            from datetime import datetime, timedelta
-            cutoff = datetime.now() - timedelta(days=days_back)
-
-            recent_similar = []
-            for post in similar:
-                if post.get("interaction_type") == "posted":
-                    # Check if recent enough
-                    timestamp = post.get("timestamp")
-                    if timestamp and timestamp > cutoff:
-                        recent_similar.append(post)
-
             if recent_similar:
                 logger.info(f"⚠️ Found {len(recent_similar)} similar posts in last {days_back} days")
                 for i, post in enumerate(recent_similar[:3], 1):
@@ -172,8 +167,6 @@ class PostMemoryTracker:
             Summary string
         """
         try:
-            from datetime import datetime, timedelta
-            import pytz
             from config import Config
 
             # Get today's posts
@@ -220,17 +213,16 @@ class PostMemoryTracker:
         Returns:
             (should_post, reason)
         """
-        similar = self.check_similar_recent_posts(
-            topic=topic,
-            min_similarity=similarity_threshold,
-            days_back=3
+        best = self.vector_memory.find_best_similar(
+            query_text=topic,
+            interaction_type="posted",
+            since=datetime.now(timezone.utc) - timedelta(days=3)
         )
 
-        if not similar:
+        if best is None:
             return True, "Topic is fresh, no recent similar posts"
 
-        # Found very similar content
-        highest_similarity = max(p.get("similarity_score", 0) for p in similar)
+        highest_similarity, _ = best
 
         if highest_similarity >= similarity_threshold:
             return False, f"Too similar to recent post ({highest_similarity:.0%} match) - avoid repetition"
@@ -100,6 +100,48 @@ resource "google_artifact_registry_repository" "phantom_repo" {
 # The Google provider doesn't support a data source for Firestore databases,
 # and we don't want to recreate it. The Cloud Run job will use it directly.
 
+# Composite indexes for the vector memory queries (memory_system.py).
+# Single-field filters like the 24h timestamp count() use Firestore's
+# automatic indexes and need nothing here.
+
+# get_user_interaction_history: author == X ORDER BY timestamp DESC
+resource "google_firestore_index" "memory_author_timestamp" {
+  project    = var.project_id
+  database   = "(default)"
+  collection = "ai_memory"
+
+  fields {
+    field_path = "author"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "timestamp"
+    order      = "DESCENDING"
+  }
+
+  depends_on = [google_project_service.required_apis["firestore.googleapis.com"]]
+}
+
+# Similarity cache warm read: interaction_type == X AND timestamp >= T ORDER BY timestamp DESC
+resource "google_firestore_index" "memory_type_timestamp" {
+  project    = var.project_id
+  database   = "(default)"
+  collection = "ai_memory"
+
+  fields {
+    field_path = "interaction_type"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "timestamp"
+    order      = "DESCENDING"
+  }
+
+  depends_on = [google_project_service.required_apis["firestore.googleapis.com"]]
+}
+
 # ============================================================================
 # Secret Manager - Reference EXISTING secrets (don't create new ones)
 # Secrets are expected to already exist in the project
@@ -214,6 +214,61 @@ class TestAIAgentController(unittest.TestCase):
         self.assertEqual(self.controller._daily_stats["posts_created"], 6)
         self.assertEqual(self.controller._daily_stats["videos_generated"], 3)
 
+    def test_record_post_and_log_single_batch(self):
+        """Should write the post log and counters in one batch commit."""
+        self.controller._daily_stats = {
+            "posts_created": 5,
+            "images_generated": 1
+        }
+        mock_batch = self.mock_db.batch.return_value
+
+        self.controller.record_post_and_log({"type": "image", "content": "hi"}, True, "image")
+
+        self.assertEqual(mock_batch.set.call_count, 2)
+        mock_batch.update.assert_not_called()
+        mock_batch.commit.assert_called_once()
+        self.assertEqual(self.controller._daily_stats["posts_created"], 6)
+        self.assertEqual(self.controller._daily_stats["images_generated"], 2)
+
+    def test_record_post_and_log_creates_missing_daily_doc(self):
+        """Should merge-set the counters so a missing daily doc can't sink the batch."""
+        self.controller._daily_stats = {}
+        mock_batch = self.mock_db.batch.return_value
+        daily_ref = self.mock_collection.document.return_value
+
+        self.controller.record_post_and_log({"type": "text", "content": "hi"}, True, "text")
+
+        counter_call = mock_batch.set.call_args_list[-1]
+        self.assertIs(counter_call.args[0], daily_ref)
+        self.assertEqual(counter_call.kwargs, {"merge": True})
+        self.assertIn("posts_created", counter_call.args[1])
+        mock_batch.commit.assert_called_once()
+        self.assertEqual(self.controller._daily_stats["posts_created"], 1)
+
+    def test_record_post_and_log_failure_skips_counters(self):
+        """Should only log (no counter update) for a failed post."""
+        self.controller._daily_stats = {"posts_created": 5}
+        mock_batch = self.mock_db.batch.return_value
+
+        self.controller.record_post_and_log({"type": "text"}, False, "text", error="boom")
+
+        mock_batch.set.assert_called_once()
+        mock_batch.commit.assert_called_once()
+        self.assertEqual(self.controller._daily_stats["posts_created"], 5)
+
+    def test_mention_check_rate_limit_uses_cached_doc(self):
+        """Should enforce the 15 min gap from the write-through, without a Firestore GET."""
+        self.controller._daily_stats = {"mentions_checked": 0}
+        doc_ref = self.mock_collection.document.return_value
+        doc_ref.get.reset_mock()
+
+        self.controller.record_mention_check()
+        allowed, reason = self.controller.can_check_mentions()
+
+        self.assertFalse(allowed)
+        self.assertIn("wait", reason)
+        doc_ref.get.assert_not_called()
+
     def test_get_daily_summary(self):
         """Should return formatted daily summary."""
         self.controller._daily_stats = {
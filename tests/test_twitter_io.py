@@ -0,0 +1,158 @@
+"""
+Tests for twitter_io - tweet length accounting and retry backoff.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock environment variables before importing
+os.environ["PROJECT_ID"] = "test-project"
+os.environ["REGION"] = "us-central1"
+
+# Mock GCP dependencies
+sys.modules["google.cloud"] = MagicMock()
+sys.modules["google.cloud.firestore"] = MagicMock()
+sys.modules["google.cloud.secretmanager"] = MagicMock()
+
+import requests
+import tweepy
+
+from twitter_io import (
+    ELLIPSIS, RETRY_CAP, TCO_URL_LENGTH, TWEET_LIMIT, backoff_retry, truncate_tweet, weighted_len
+)
+
+
+def _http_error(cls, status, headers=None):
+    """A tweepy HTTPException wrapping a minimal fake response."""
+    response = MagicMock()
+    response.status_code = status
+    response.reason = "error"
+    response.headers = headers or {}
+    response.json.return_value = {}
+    return cls(response)
+
+
+class TestWeightedLen(unittest.TestCase):
+    """Test Twitter-weighted character counting."""
+
+    def test_ascii_counts_one_per_char(self):
+        self.assertEqual(weighted_len("hello world"), 11)
+
+    def test_emoji_and_cjk_count_two(self):
+        self.assertEqual(weighted_len("\U0001F680"), 2)
+        self.assertEqual(weighted_len("中文"), 4)
+        self.assertEqual(weighted_len("hi \U0001F680"), 5)
+
+    def test_url_counts_as_tco_link(self):
+        url = "https://example.com/" + "a" * 100
+        self.assertEqual(weighted_len(url), TCO_URL_LENGTH)
+        self.assertEqual(weighted_len(f"read {url} now"), 5 + TCO_URL_LENGTH + 4)
+
+
+class TestTruncateTweet(unittest.TestCase):
+    """Test fitting text into the tweet limit."""
+
+    def test_short_text_unchanged(self):
+        self.assertEqual(truncate_tweet("hello"), "hello")
+
+    def test_long_ascii_cut_with_ellipsis(self):
+        text = "word " * 100
+
+        result = truncate_tweet(text)
+
+        self.assertTrue(result.endswith(ELLIPSIS))
+        self.assertLessEqual(weighted_len(result), TWEET_LIMIT)
+
+    def test_emoji_text_fits_weighted_limit(self):
+        text = "\U0001F680" * 200  # 400 weighted
+
+        result = truncate_tweet(text)
+
+        self.assertTrue(result.endswith(ELLIPSIS))
+        self.assertLessEqual(weighted_len(result), TWEET_LIMIT)
+
+    def test_cjk_text_fits_weighted_limit(self):
+        result = truncate_tweet("中" * 200, limit=20)
+
+        self.assertEqual(result, "中" * 9 + ELLIPSIS)
+        self.assertEqual(weighted_len(result), 20)
+
+    def test_url_kept_whole_or_dropped(self):
+        url = "https://example.com/" + "a" * 100
+        text = "x" * 270 + " " + url  # 294 weighted
+
+        result = truncate_tweet(text)
+
+        self.assertNotIn("https://", result)
+        self.assertLessEqual(weighted_len(result), TWEET_LIMIT)
+
+    def test_long_url_fits_as_tco_link(self):
+        url = "https://example.com/" + "a" * 300
+        self.assertEqual(truncate_tweet(url), url)
+
+    def test_bytes_input_decoded(self):
+        self.assertEqual(truncate_tweet("café".encode("utf-8")), "café")
+        self.assertIsInstance(truncate_tweet(b"x" * 300), str)
+
+    def test_limit_smaller_than_ellipsis(self):
+        """Should never exceed limit, even when the ellipsis alone wouldn't fit."""
+        self.assertEqual(truncate_tweet("abc", 1), "a")
+        self.assertEqual(truncate_tweet("abc", 0), "")
+        self.assertLessEqual(weighted_len(truncate_tweet("\U0001F680\U0001F680", 1)), 1)
+
+
+class TestBackoffRetry(unittest.TestCase):
+    """Test the retry wrapper around Twitter calls."""
+
+    @patch("twitter_io.time.sleep")
+    def test_retryable_error_then_success(self, mock_sleep):
+        """Should sleep and retry after a transient failure."""
+        fn = MagicMock(side_effect=[requests.exceptions.ConnectionError("reset"), "ok"])
+
+        result = backoff_retry(fn, "a", key="b")
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(fn.call_count, 2)
+        fn.assert_called_with("a", key="b")
+        mock_sleep.assert_called_once()
+
+    @patch("twitter_io.time.sleep")
+    def test_non_retryable_4xx_raises_immediately(self, mock_sleep):
+        """Should not retry a client error - it will fail the same way again."""
+        fn = MagicMock(side_effect=_http_error(tweepy.Forbidden, 403))
+
+        with self.assertRaises(tweepy.Forbidden):
+            backoff_retry(fn)
+
+        fn.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    @patch("twitter_io.time.sleep")
+    def test_rate_limit_wait_honored(self, mock_sleep):
+        """Should sleep for the server's retry-after on a 429."""
+        error = _http_error(tweepy.TooManyRequests, 429, {"retry-after": "7"})
+        fn = MagicMock(side_effect=[error, "ok"])
+
+        self.assertEqual(backoff_retry(fn), "ok")
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("twitter_io.time.sleep")
+    def test_rate_limit_wait_beyond_cap_raises(self, mock_sleep):
+        """Should give up instead of sleeping through a 429 wait longer than the cap."""
+        error = _http_error(tweepy.TooManyRequests, 429, {"retry-after": str(RETRY_CAP + 1)})
+        fn = MagicMock(side_effect=error)
+
+        with self.assertRaises(tweepy.TooManyRequests):
+            backoff_retry(fn)
+
+        fn.assert_called_once()
+        mock_sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
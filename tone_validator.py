@@ -108,19 +108,8 @@ class ToneValidator:
             r'\blooking forward to\b',
         ]
 
-    def validate(self, content: str) -> Tuple[bool, Optional[str]]:
-        """
-        Validates content tone.
-        Returns (is_valid, reason_if_invalid)
-        """
-        content_lower = content.lower()
-
-        # Check for style labels leaking
-        if content.startswith("Style") or "**Style" in content or "Style A:" in content or "Style B:" in content:
-            return False, "Style label leaked into content. Write tweet directly."
-
-        # Check each pattern category
-        checks = [
+        # Compiled once: each category's patterns joined into a single regex
+        categories = [
             (self.observational_patterns, "observational/preachy",
              "Sounds preachy. State facts directly, don't observe from outside."),
             (self.meta_commentary_patterns, "meta-commentary",
@@ -144,14 +133,29 @@ class ToneValidator:
             (self.corporate_patterns, "corporate speak",
              "No corporate language. Sound like a person, not a company."),
         ]
+        self._checks = [
+            (re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE), category, reason)
+            for patterns, category, reason in categories
+        ]
+
+    def validate(self, content: str) -> Tuple[bool, Optional[str]]:
+        """
+        Validates content tone.
+        Returns (is_valid, reason_if_invalid)
+        """
+        content_lower = content.lower()
+
+        # Check for style labels leaking
+        if content.startswith("Style") or "**Style" in content or "Style A:" in content or "Style B:" in content:
+            return False, "Style label leaked into content. Write tweet directly."
 
-        for patterns, category, reason in checks:
-            for pattern in patterns:
-                if re.search(pattern, content_lower, re.IGNORECASE):
-                    match = re.search(pattern, content_lower, re.IGNORECASE)
-                    matched_text = match.group() if match else ""
-                    logger.warning(f"Tone validation REJECT [{category}]: '{matched_text}' in: {content}")
-                    return False, f"{reason} (matched: '{matched_text}')"
+        # Check each pattern category - one precompiled alternation per category
+        for regex, category, reason in self._checks:
+            match = regex.search(content_lower)
+            if match:
+                matched_text = match.group()
+                logger.warning(f"Tone validation REJECT [{category}]: '{matched_text}' in: {content}")
+                return False, f"{reason} (matched: '{matched_text}')"
 
         return True, None
 
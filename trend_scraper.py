@@ -18,9 +18,13 @@ All sources have:
 - Fallback to empty list on failure
 """
 
+import importlib.util
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import feedparser
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
@@ -28,12 +32,19 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# C-based lxml parser when available (several times faster than html.parser)
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+# "1,234 stars today" -> 1,234
+_STARS_RE = re.compile(r'([\d,]+)')
+
 
 class TrendScraper:
     """Robust multi-source trend aggregator."""
 
     def __init__(self):
         self.session = requests.Session()
+        self.session.mount('https://', self._pooled_adapter())
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/html, */*',
@@ -43,6 +54,24 @@ class TrendScraper:
         self.cache_ttl = timedelta(minutes=30)
         self.timeout = 10
 
+    @staticmethod
+    def _pooled_adapter() -> HTTPAdapter:
+        """
+        Keep-alive pool sized for get_all_trends' parallel fetches, with a short
+        backoff retry on 429/5xx. Retry-After is ignored: trends are best-effort
+        and a long wait would stall the whole batch.
+        """
+        retry = Retry(
+            total=2,
+            read=False,  # a read timeout already waited self.timeout - don't repeat it
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=False,
+            raise_on_status=False,  # hand the last response to raise_for_status()
+        )
+        return HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+
     def _safe_request(self, url: str, **kwargs) -> Optional[requests.Response]:
         """Make a safe HTTP request with error handling."""
         try:
@@ -94,12 +123,17 @@ class TrendScraper:
 
             story_ids = resp.json()[:limit]
 
-            # Fetch each story (parallel would be better but keeping simple)
-            for story_id in story_ids:
-                story_resp = self._safe_request(
+            # Fetch the stories in parallel (one round trip each), keeping rank order
+            def fetch_story(story_id):
+                return self._safe_request(
                     f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json",
                     timeout=5
                 )
+
+            with ThreadPoolExecutor(max_workers=max(1, len(story_ids))) as executor:
+                story_resps = list(executor.map(fetch_story, story_ids))
+
+            for story_id, story_resp in zip(story_ids, story_resps):
                 if story_resp:
                     story = story_resp.json()
                     if story and story.get("title"):
@@ -214,7 +248,7 @@ class TrendScraper:
             if not resp:
                 return trends
 
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            soup = BeautifulSoup(resp.text, HTML_PARSER)
             articles = soup.select('article.Box-row')[:limit]
 
             for article in articles:
@@ -239,7 +273,7 @@ class TrendScraper:
                 stars_today = 0
                 if stars_span:
                     stars_text = stars_span.get_text(strip=True)
-                    stars_match = re.search(r'([\d,]+)', stars_text)
+                    stars_match = _STARS_RE.search(stars_text)
                     if stars_match:
                         stars_today = int(stars_match.group(1).replace(',', ''))
 
@@ -405,26 +439,30 @@ class TrendScraper:
         """
         all_trends = []
 
-        # Tech news (high priority)
-        all_trends.extend(self.get_hackernews_trends(limit_per_source))
-        all_trends.extend(self.get_lobsters_trends(limit_per_source // 2))
-
-        # Crypto (always relevant)
-        all_trends.extend(self.get_crypto_trends(limit_per_source))
-
-        # Developer content
-        all_trends.extend(self.get_github_trending(limit_per_source))
-        all_trends.extend(self.get_devto_trends(limit_per_source // 2))
-
-        # News
-        all_trends.extend(self.get_techcrunch_rss(limit_per_source))
-
-        # AI specific
-        all_trends.extend(self.get_ai_papers(limit_per_source // 2))
-
+        fetches = [
+            # Tech news (high priority)
+            (self.get_hackernews_trends, limit_per_source),
+            (self.get_lobsters_trends, limit_per_source // 2),
+            # Crypto (always relevant)
+            (self.get_crypto_trends, limit_per_source),
+            # Developer content
+            (self.get_github_trending, limit_per_source),
+            (self.get_devto_trends, limit_per_source // 2),
+            # News
+            (self.get_techcrunch_rss, limit_per_source),
+            # AI specific
+            (self.get_ai_papers, limit_per_source // 2),
+        ]
         # Reddit (various subreddits)
         for sub in ["technology", "cryptocurrency", "MachineLearning", "programming"]:
-            all_trends.extend(self.get_reddit_trends(sub, limit_per_source // 2))
+            fetches.append((lambda limit, sub=sub: self.get_reddit_trends(sub, limit), limit_per_source // 2))
+
+        # Every source is independent network I/O - fetch them all at once.
+        # Each getter handles its own errors and returns [] on failure.
+        with ThreadPoolExecutor(max_workers=len(fetches)) as executor:
+            futures = [executor.submit(fetch, limit) for fetch, limit in fetches]
+        for future in futures:
+            all_trends.extend(future.result())
 
         # Sort by score/engagement where available
         def get_score(item):
@@ -0,0 +1,395 @@
+"""
+Twitter I/O - Authenticated clients and resilient post/upload calls
+
+Shared by the posting entry point (main.py):
+- Parallel Secret Manager fetch + process-wide client cache
+- Pooled keep-alive session for the v2 client
+- Jittered exponential backoff that honors 429 waits
+- Streamed chunked media upload
+- Tweet length fitting (Twitter-weighted)
+"""
+
+import os
+import re
+import json
+import mmap
+import time
+import hashlib
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import FLAGS, get_secret
+
+logger = logging.getLogger(__name__)
+
+TWEET_LIMIT = 280
+ELLIPSIS = "\u2026"
+
+# Twitter wraps every URL in t.co, which counts as 23 characters whatever its real length
+_URL_RE = re.compile(r"https?://\S+")
+TCO_URL_LENGTH = 23
+
+# Recent successful verify_credentials() marker (lets warm containers skip the call)
+VERIFY_MARKER_PATH = "/tmp/.twitter_verified.json"
+VERIFY_MARKER_MAX_AGE = 6 * 60 * 60  # 6 hours
+
+# Retry policy shared by every Twitter call (full-jitter exponential backoff)
+RETRY_ATTEMPTS = 3
+RETRY_BASE = 2.0   # seconds, doubled per attempt before jitter
+RETRY_CAP = 60.0   # longest backoff, and longest 429 wait we'll sit out
+
+# APPEND segment size for chunked uploads - Twitter's 5 MB max, vs tweepy's 1 MB default
+UPLOAD_SEGMENT_SIZE = 5 * 1024 * 1024
+
+# Connection warmup target - same host tweepy.Client posts to
+TWITTER_API_HOST = "https://api.twitter.com/"
+WARMUP_TIMEOUT = 5  # seconds
+
+
+def _retryable_errors() -> tuple:
+    """Errors worth retrying - anything else (4xx, bad media) will fail the same way again."""
+    import requests
+    import tweepy
+    return (
+        tweepy.TooManyRequests,
+        tweepy.TwitterServerError,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    )
+
+
+def _rate_limit_wait(error) -> float:
+    """Seconds Twitter asked us to wait on a 429, or 0 if it didn't say."""
+    headers = getattr(error.response, "headers", None) or {}
+    try:
+        if headers.get("retry-after"):
+            return max(0.0, float(headers["retry-after"]))
+        if headers.get("x-rate-limit-reset"):
+            return max(0.0, float(headers["x-rate-limit-reset"]) - time.time())
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+
+def backoff_retry(fn, *args, max_attempts=RETRY_ATTEMPTS, base=RETRY_BASE, cap=RETRY_CAP, **kwargs):
+    """
+    Call fn with truncated exponential backoff and full jitter.
+
+    On a 429 the server-provided wait is honored instead, but only up to
+    `cap` seconds - a longer wait means the quota window is gone for this run.
+    """
+    import tweepy
+    retryable = _retryable_errors()
+
+    for attempt in range(max_attempts):
+        try:
+            return fn(*args, **kwargs)
+        except retryable as e:
+            if attempt == max_attempts - 1:
+                raise
+
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            if isinstance(e, tweepy.TooManyRequests):
+                wait = _rate_limit_wait(e)
+                if wait > cap:
+                    raise
+                delay = wait or delay
+
+            logger.warning("%s failed (%s), retry %s/%s in %.1fs",
+                           getattr(fn, '__name__', 'Twitter call'), e, attempt + 1, max_attempts - 1, delay)
+            time.sleep(delay)
+
+
+def post_tweet_v2(client, text, **kwargs):
+    """Post tweet with retry logic."""
+    import tweepy
+    try:
+        return backoff_retry(client.create_tweet, text=text, **kwargs)
+    except tweepy.Unauthorized:
+        # Credentials went bad since we last verified - force a live check next run
+        _clear_verified_marker()
+        raise
+
+
+def _upload_mapped(api, filename, **kwargs):
+    """One upload attempt, handing tweepy a read-only mmap of the file instead of a path."""
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return api.media_upload(os.path.basename(filename), file=mm, **kwargs)
+
+
+def upload_media_v1(api, filename, **kwargs):
+    """Upload media with retry logic (each attempt maps the file afresh)."""
+    if kwargs.get("chunked"):
+        kwargs.setdefault("chunk_size", UPLOAD_SEGMENT_SIZE)  # 5x fewer APPEND round-trips
+    return backoff_retry(_upload_mapped, api, filename, **kwargs)
+
+
+def upload_media_stream(api, chunks, total_bytes, media_type, media_category=None,
+                        filename="video.mp4"):
+    """
+    Chunked upload (INIT/APPEND/FINALIZE) fed from an iterator of bytes, e.g. a
+    streaming HTTP body - the media never has to land on disk.
+
+    Incoming chunks are regrouped into UPLOAD_SEGMENT_SIZE segments; each APPEND
+    is retried on its own, the source stream itself can't be rewound.
+    """
+    media = backoff_retry(api.chunked_upload_init, total_bytes, media_type,
+                          media_category=media_category)
+    media_id = media.media_id
+
+    buffer = bytearray()
+    sent = 0
+    segment_index = 0
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= UPLOAD_SEGMENT_SIZE:
+            segment = bytes(buffer[:UPLOAD_SEGMENT_SIZE])
+            del buffer[:UPLOAD_SEGMENT_SIZE]
+            backoff_retry(api.chunked_upload_append, media_id, (filename, segment), segment_index)
+            sent += len(segment)
+            segment_index += 1
+    if buffer:
+        backoff_retry(api.chunked_upload_append, media_id, (filename, bytes(buffer)), segment_index)
+        sent += len(buffer)
+
+    if sent != total_bytes:
+        raise IOError(f"Media stream ended early: {sent}/{total_bytes} bytes")
+
+    media = backoff_retry(api.chunked_upload_finalize, media_id)
+
+    # Video needs server-side processing before it can be attached
+    processing_info = getattr(media, "processing_info", None)
+    while processing_info and processing_info.get("state") in ("pending", "in_progress"):
+        time.sleep(processing_info.get("check_after_secs", 1))
+        media = backoff_retry(api.get_media_upload_status, media_id)
+        processing_info = getattr(media, "processing_info", None)
+
+    if processing_info and processing_info.get("state") == "failed":
+        raise IOError(f"Media processing failed: {processing_info.get('error')}")
+
+    return media
+
+
+# Authenticated (api_v1, client_v2), reused across main() calls in a warm process
+_TWITTER_CLIENTS = None
+_TWITTER_CLIENTS_LOCK = threading.Lock()
+
+# Secrets behind _TWITTER_CLIENTS are re-read after this long to pick up token rotation
+CREDS_MAX_AGE = 60 * 60  # 1 hour
+_CREDS_FETCHED_AT = 0.0
+_CREDS_HASH = None
+
+REQUIRED_TWITTER_SECRETS = [
+    "TWITTER_CONSUMER_KEY",
+    "TWITTER_CONSUMER_SECRET",
+    "TWITTER_ACCESS_TOKEN",
+    "TWITTER_ACCESS_TOKEN_SECRET"
+]
+
+
+def _keepalive_adapter():
+    """HTTPAdapter whose sockets send TCP keep-alives, so pooled connections survive idle gaps."""
+    import socket
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+
+    # Extend urllib3's defaults rather than replace them - they carry TCP_NODELAY
+    socket_options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    if hasattr(socket, "TCP_KEEPIDLE"):  # Linux only
+        socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60))
+
+    class KeepAliveAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["socket_options"] = socket_options
+            super().init_poolmanager(*args, **kwargs)
+
+    return KeepAliveAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+
+
+def _configure_session_pool(session):
+    """
+    Keep-alive connection pool for tweepy.Client, so thread replies reuse one TLS connection.
+
+    tweepy.API closes its session after every request, so only the v2 client benefits.
+    Retries stay in backoff_retry, not urllib3.
+    """
+    session.mount("https://", _keepalive_adapter())
+
+
+def _warm_connection(client_v2):
+    """
+    Open the pooled api.twitter.com connection now (DNS + TLS) instead of on the first tweet.
+
+    An unauthenticated HEAD, so cold starts don't spend the users/me rate limit.
+    """
+    try:
+        client_v2.session.head(TWITTER_API_HOST, timeout=WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.debug("Twitter connection warmup failed: %s", e)
+
+
+def _token_hash(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+
+def _recently_verified(access_token: str) -> bool:
+    """True if these credentials passed verify_credentials() within the marker window."""
+    try:
+        with open(VERIFY_MARKER_PATH) as f:
+            marker = json.load(f)
+        return (
+            marker.get("token_hash") == _token_hash(access_token)
+            and time.time() - marker.get("verified_at", 0) < VERIFY_MARKER_MAX_AGE
+        )
+    except (OSError, ValueError):
+        return False
+
+
+def _mark_verified(access_token: str):
+    try:
+        with open(VERIFY_MARKER_PATH, "w") as f:
+            json.dump({"verified_at": time.time(), "token_hash": _token_hash(access_token)}, f)
+    except OSError as e:
+        logger.debug("Could not write verify marker: %s", e)
+
+
+def _clear_verified_marker():
+    try:
+        os.remove(VERIFY_MARKER_PATH)
+    except OSError:
+        pass
+
+
+def _creds_fresh() -> bool:
+    return time.time() - _CREDS_FETCHED_AT < CREDS_MAX_AGE
+
+
+def get_twitter_api():
+    """
+    Authenticate with Twitter API (cached after the first success).
+
+    Cached clients skip verify_credentials() - a bad token surfaces on the
+    actual post. Secrets are re-read every CREDS_MAX_AGE and the clients
+    rebuilt only if they changed.
+    """
+    import tweepy
+    global _TWITTER_CLIENTS, _CREDS_FETCHED_AT, _CREDS_HASH
+    if _TWITTER_CLIENTS is not None and _creds_fresh():
+        return _TWITTER_CLIENTS
+
+    with _TWITTER_CLIENTS_LOCK:
+        if _TWITTER_CLIENTS is not None and _creds_fresh():
+            return _TWITTER_CLIENTS
+
+        # Fetch all secrets in parallel - each is a Secret Manager round-trip
+        refresh = _TWITTER_CLIENTS is not None
+        with ThreadPoolExecutor(max_workers=len(REQUIRED_TWITTER_SECRETS)) as executor:
+            values = executor.map(lambda name: get_secret(name, refresh=refresh), REQUIRED_TWITTER_SECRETS)
+            secrets = dict(zip(REQUIRED_TWITTER_SECRETS, values))
+
+        for secret_id, val in secrets.items():
+            if not val:
+                raise ValueError(f"Missing required secret: {secret_id}")
+
+        creds_hash = _token_hash("\0".join(secrets[name] for name in REQUIRED_TWITTER_SECRETS))
+        if _TWITTER_CLIENTS is not None and creds_hash == _CREDS_HASH:
+            _CREDS_FETCHED_AT = time.time()
+            return _TWITTER_CLIENTS
+
+        auth = tweepy.OAuth1UserHandler(
+            secrets["TWITTER_CONSUMER_KEY"],
+            secrets["TWITTER_CONSUMER_SECRET"],
+            secrets["TWITTER_ACCESS_TOKEN"],
+            secrets["TWITTER_ACCESS_TOKEN_SECRET"]
+        )
+
+        api_v1 = tweepy.API(auth)
+        client_v2 = tweepy.Client(
+            consumer_key=secrets["TWITTER_CONSUMER_KEY"],
+            consumer_secret=secrets["TWITTER_CONSUMER_SECRET"],
+            access_token=secrets["TWITTER_ACCESS_TOKEN"],
+            access_token_secret=secrets["TWITTER_ACCESS_TOKEN_SECRET"]
+        )
+
+        _configure_session_pool(client_v2.session)
+
+        # Off by default: the post itself surfaces auth failures, without spending a request
+        access_token = secrets["TWITTER_ACCESS_TOKEN"]
+        if FLAGS.verify_twitter_creds:
+            if _recently_verified(access_token):
+                logger.info("Skipping verify_credentials (verified recently)")
+            else:
+                api_v1.verify_credentials()
+                _mark_verified(access_token)
+
+        _warm_connection(client_v2)
+
+        _TWITTER_CLIENTS = (api_v1, client_v2)
+        _CREDS_HASH = creds_hash
+        _CREDS_FETCHED_AT = time.time()
+        return _TWITTER_CLIENTS
+
+
+def _char_weight(char: str) -> int:
+    """Twitter counts Latin, punctuation and a few symbol ranges as 1, everything else (CJK, emoji) as 2."""
+    cp = ord(char)
+    if cp <= 0x10FF or 0x2000 <= cp <= 0x200D or 0x2010 <= cp <= 0x201F or 0x2032 <= cp <= 0x2037:
+        return 1
+    return 2
+
+
+def _plain_len(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return sum(map(_char_weight, text))
+
+
+def weighted_len(text: str) -> int:
+    """Length as Twitter counts it against the 280 limit (every URL counts as a t.co link)."""
+    total, pos = 0, 0
+    for match in _URL_RE.finditer(text):
+        total += _plain_len(text[pos:match.start()]) + TCO_URL_LENGTH
+        pos = match.end()
+    return total + _plain_len(text[pos:])
+
+
+def _fit_prefix(text: str, budget: int) -> int:
+    """Index of the longest prefix within budget; URLs are kept whole or dropped whole."""
+    used, pos = 0, 0
+    segments = [(m.start(), m.end()) for m in _URL_RE.finditer(text)] + [(len(text), len(text))]
+    for url_start, url_end in segments:
+        for i in range(pos, url_start):
+            used += _char_weight(text[i])
+            if used > budget:
+                return i
+        if url_start == url_end:
+            break
+        used += TCO_URL_LENGTH
+        if used > budget:
+            return url_start
+        pos = url_end
+    return len(text)
+
+
+def truncate_tweet(text, limit: int = TWEET_LIMIT) -> str:
+    """
+    Fit text into limit (Twitter-weighted) characters, ending with an ellipsis
+    if cut. Cuts at a word boundary when one is reasonably close. Bytes are
+    decoded once.
+    """
+    if isinstance(text, (bytes, bytearray)):
+        text = text.decode("utf-8")
+    if weighted_len(text) <= limit:
+        return text
+
+    # Twitter weighs "…" as 2 characters - still one cheaper than "..."
+    ellipsis_len = _char_weight(ELLIPSIS)
+    if limit < ellipsis_len:
+        return text[:_fit_prefix(text, limit)]
+    cut = _fit_prefix(text, limit - ellipsis_len)
+    head = text[:cut]
+    space = head.rfind(" ")
+    if space > cut // 2:
+        head = head[:space]
+    return head.rstrip() + ELLIPSIS